@@ -0,0 +1,108 @@
+import sys
+import inspect
+import argparse
+from itertools import islice
+import numpy as np
+
+
+def arg_count(func):
+    """Return the number of arguments a function takes."""
+    return len(inspect.signature(func).parameters)
+
+
+def read_chunks(f, n_args, chunk_rows, binary=False):
+    """Yield (rows, n_args) arrays of arguments from an open file.
+
+    Text files are CSV with one row of arguments per line. Binary files are
+    packed native float64s, n_args per row.
+
+    """
+    while True:
+        if binary:
+            chunk = np.fromfile(f, dtype=np.float64, count=chunk_rows * n_args)
+            if not chunk.size:
+                return
+            yield chunk.reshape(-1, n_args)
+        else:
+            lines = list(islice(f, chunk_rows))
+            if not lines:
+                return
+            yield np.loadtxt(lines, delimiter=',', ndmin=2)
+
+
+def batch_eval(func, in_file, out_file=None, chunk_rows=100000,
+               binary=False):
+    """Stream every row of arguments in in_file through func.
+
+    Results go to out_file, or stdout if it is None. Returns the row count.
+
+    """
+    mode = 'b' if binary else ''
+    with open(in_file, 'r' + mode) as f_in:
+        if out_file is None:
+            f_out = sys.stdout.buffer if binary else sys.stdout
+            return eval_stream(func, f_in, f_out, chunk_rows, binary)
+
+        with open(out_file, 'w' + mode) as f_out:
+            return eval_stream(func, f_in, f_out, chunk_rows, binary)
+
+
+def eval_stream(func, f_in, f_out, chunk_rows=100000, binary=False):
+    """Evaluate func over every row of an open file, writing to another.
+
+    Rows are read, evaluated and written a chunk at a time, so memory use
+    stays the same no matter how big the file is. Returns the row count.
+
+    """
+    n_args = arg_count(func)
+    rows = 0
+
+    for chunk in read_chunks(f_in, n_args, chunk_rows, binary):
+        if chunk.shape[1] != n_args:
+            raise ValueError('expected {} arguments per row, got {}'
+                             .format(n_args, chunk.shape[1]))
+
+        result = np.asarray(func(*chunk.T), dtype=np.float64)
+        if binary:
+            f_out.write(result.tobytes())
+        else:
+            np.savetxt(f_out, result, fmt='%.17g')
+        rows += len(chunk)
+
+    f_out.flush()
+    return rows
+
+
+def get_args(description):
+    """Init the parser and return the arguments."""
+    parser = argparse.ArgumentParser(description=description)
+
+    parser.add_argument('-b', '--batch', type=int, metavar='METHOD',
+                        help='evaluate a method over every row of a file')
+    parser.add_argument('-i', '--input', help='the file of argument rows')
+    parser.add_argument('-o', '--output',
+                        help='the file to write results to (default: stdout)')
+    parser.add_argument('--binary', action='store_true',
+                        help='read and write float64s instead of CSV')
+    parser.add_argument('-c', '--chunk', type=int, default=100000,
+                        help='rows to evaluate at a time')
+
+    args = parser.parse_args()
+    if args.batch is not None and args.input is None:
+        parser.error('--batch needs an --input file')
+    return args
+
+
+def run_batch(funcs, args):
+    """Run the batch mode described by the arguments."""
+    try:
+        rows = batch_eval(funcs[args.batch], args.input, args.output,
+                          args.chunk, args.binary)
+    except KeyError:
+        print('Invalid option: {}'.format(args.batch), file=sys.stderr)
+        return
+    except (OSError, ValueError) as e:
+        print('Error: {}'.format(e), file=sys.stderr)
+        return
+
+    print('Evaluated {} rows'.format(rows), file=sys.stderr)
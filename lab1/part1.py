@@ -1,8 +1,13 @@
+import sys
+import glob
 import argparse
 import pygame
-from os import path, getcwd
-from time import sleep
-from pygame.mixer import Sound
+from os import path, getcwd, listdir
+from time import sleep, perf_counter
+from threading import Thread, Event
+from concurrent.futures import ThreadPoolExecutor
+from pygame.mixer import Sound, Channel, music
+from song_index import AUDIO_EXTS, scan, format_entry
 
 
 def play_song_sync(song):
@@ -11,11 +16,35 @@ def play_song_sync(song):
     sleep(song.get_length())
 
 
+def play_song_stream(filename, on_done=None, poll=0.05):
+    """Stream a song from disk, returning as soon as it starts.
+
+    Only a small buffer is decoded at a time, so playback starts right away
+    and memory use doesn't grow with the song. on_done is called from a
+    watcher thread when the song ends. Returns False if it couldn't load.
+
+    """
+    try:
+        music.load(filename)
+    except pygame.error:
+        return False
+
+    def watch():
+        while music.get_busy():
+            sleep(poll)
+        if on_done:
+            on_done()
+
+    music.play()
+    Thread(target=watch, daemon=True).start()
+    return True
+
+
 def load_song(filename):
     """Attempt to load the song, catching any exceptions."""
     try:
         return Sound(file=filename)
-    except pygame.error as e:
+    except (pygame.error, OSError):
         return None
 
 
@@ -25,32 +54,147 @@ def format_song_info(name, song):
     return 'Playing {} ({}:{})'.format(name, int(m), int(s))
 
 
-def parse_path(args):
+def parse_path(args, filename):
     """Return the full path to the file."""
     if args.directory:
-        return path.join(args.directory, args.filename)
+        return path.join(args.directory, filename)
+
+    return path.join(getcwd(), filename)
+
+
+def parse_paths(args):
+    """Return the full paths of all the files, directories and globs given.
+
+    Directories are expanded to the audio files in them. Anything that
+    doesn't match is kept, so it gets reported when it fails to load.
+
+    """
+    paths = list()
+    for name in args.filenames:
+        full = parse_path(args, name)
+        if path.isdir(full):
+            paths.extend(sorted(path.join(full, f) for f in listdir(full)
+                                if f.lower().endswith(AUDIO_EXTS)))
+        else:
+            paths.extend(sorted(glob.glob(full)) or [full])
+
+    return paths
+
+
+class Playlist(object):
+    """Plays songs back to back, loading the next one while one plays.
+
+    Songs are decoded on a worker thread and queued on a single channel, so
+    each starts as soon as the last ends. At most three songs are in memory:
+    the one playing, the one queued and the one loading.
+
+    """
+
+    def __init__(self, filenames, poll=0.05):
+        self.filenames = filenames
+        self.poll = poll
+        self.loader = ThreadPoolExecutor(max_workers=1)
+
+    def timed_load(self, filename):
+        """Load a song. Returns the song (or None) and the time it took."""
+        start = perf_counter()
+        song = load_song(filename)
+        return song, perf_counter() - start
+
+    def play(self):
+        """Play every song, skipping any that fail to load."""
+        if not self.filenames:
+            return
+
+        channel = Channel(0)
+        loading = self.loader.submit(self.timed_load, self.filenames[0])
+        message = None  # Printed once the queued song starts.
+
+        for i, filename in enumerate(self.filenames):
+            while not loading.done():
+                message = self.announce(channel, message)
+                sleep(self.poll)
+            song, latency = loading.result()
+
+            name = path.basename(filename)
+            if song is None:
+                print('Skipping {}: could not load it'.format(name))
+            else:
+                # Wait for the queued song to start before queueing this one.
+                self.wait_for_queue(channel)
+                self.announce(channel, message)
+                channel.queue(song)
+                message = self.announce(channel, '{} [loaded in {:.0f} ms]'
+                                        .format(format_song_info(name, song),
+                                                latency * 1000))
+
+            # Only start loading the next song now this one is queued, so
+            # the playing and queued songs are the only others in memory.
+            if i + 1 < len(self.filenames):
+                loading = self.loader.submit(self.timed_load,
+                                             self.filenames[i + 1])
+
+        self.wait_for_queue(channel)
+        self.announce(channel, message)
+        while channel.get_busy():
+            sleep(self.poll)
+
+        self.loader.shutdown()
+
+    def wait_for_queue(self, channel):
+        """Wait for the queued song to start."""
+        while channel.get_queue() is not None:
+            sleep(self.poll)
+
+    def announce(self, channel, message):
+        """Print message if the queued song has started.
+
+        Returns the message if it is still waiting to be printed, so the
+        caller can try again later.
 
-    return path.join(getcwd(), args.filename)
+        """
+        if message is not None and channel.get_queue() is None:
+            print(message)
+            return None
+        return message
 
 
 def get_args():
     """Init the parser and return the arguments."""
     parser = argparse.ArgumentParser(description='Lab 1 Part 1: Play a sound')
 
-    parser.add_argument('filename', help='the .wav file to play')
-    parser.add_argument('-d', '--directory', help='the directory for the file')
+    parser.add_argument('filenames', nargs='+',
+                        help='the files, directories or globs to play')
+    parser.add_argument('-d', '--directory', help='the directory for the files')
+    parser.add_argument('-s', '--stream', action='store_true',
+                        help='stream from disk instead of loading it all')
+    parser.add_argument('--scan', action='store_true',
+                        help='list the songs in the given directories')
     return parser.parse_args()
 
 
 if __name__ == '__main__':
     pygame.init()
 
-    # Load the song
     args = get_args()
-    path = parse_path(args)
-    song = load_song(path)
 
-    # Attempt to play it
-    if song:
-        print(format_song_info(args.filename, song))
-        play_song_sync(song)
+    if args.scan:
+        for name in args.filenames:
+            try:
+                index = scan(parse_path(args, name))
+            except OSError as e:
+                sys.exit('Error: {}'.format(e))
+
+            for song in sorted(index):
+                print(format_entry(song, index[song]))
+    elif args.stream:
+        for filename in parse_paths(args):
+            done = Event()
+            if play_song_stream(filename, on_done=done.set):
+                print('Playing {}'.format(path.basename(filename)))
+                done.wait()
+            else:
+                print('Skipping {}: could not load it'.format(
+                    path.basename(filename)))
+    else:
+        Playlist(parse_paths(args)).play()
@@ -1,4 +1,4 @@
-from math import pi, pow
+from math import pi
 from sys import exit
 
 def perim_rect(l, w):
@@ -14,15 +14,15 @@ def area_rect(l, w):
 
 
 def area_circle(r):
-    return pi * pow(r, 2)
+    return pi * r ** 2
 
 
 def area_cube(a):
-    return 6 * pow(a, 2)
+    return 6 * a ** 2
 
 
 def area_cylinder(r, h):
-    return (2 * pi * pow(r, 2)) + (2 * pi * r * h)
+    return (2 * pi * r ** 2) + (2 * pi * r * h)
 
 
 def area_trap(b1, b2, h):
@@ -49,11 +49,19 @@ Methods:
 
 
 if __name__ == '__main__':
+    from batch import get_args, run_batch
+
     funcs = {
         1: perim_rect, 2: perim_circle,  3: area_rect, 4: area_circle,
         5: area_cube,  6: area_cylinder, 7: area_trap, 8: usage_str, 9: exit
     }
 
+    opts = get_args('Lab 1 Part 2: Geometry functions')
+    if opts.batch:
+        # Only the math functions make sense in batch mode.
+        run_batch({k: v for k, v in funcs.items() if k <= 7}, opts)
+        exit()
+
     print(usage_str())
 
     while True:
@@ -1,4 +1,4 @@
-from math import pi, pow
+from math import pi
 from sys import exit
 
 
@@ -21,13 +21,13 @@ class Math(object):
         return l * w
 
     def area_circle(self, r):
-        return pi * pow(r, 2)
+        return pi * r ** 2
 
     def area_cube(self, a):
-        return 6 * pow(a, 2)
+        return 6 * a ** 2
 
     def area_cylinder(self, r, h):
-        return (2 * pi * pow(r, 2)) + (2 * pi * r * h)
+        return (2 * pi * r ** 2) + (2 * pi * r * h)
 
     def area_trap(self, b1, b2, h):
         return ((b1 + b2) * h) / 2
@@ -52,8 +52,16 @@ Methods:
 
 
 if __name__ == '__main__':
+    from batch import get_args, run_batch
+
     m = Math()
 
+    opts = get_args('Lab 1 Part 3: Geometry class')
+    if opts.batch:
+        # Only the math functions make sense in batch mode.
+        run_batch({k: v for k, v in m.funcs.items() if k <= 7}, opts)
+        exit()
+
     print(m.usage_str())
 
     while True:
@@ -0,0 +1,189 @@
+import os
+import json
+import errno
+import wave
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+# Name of the index file written to the top of each scanned directory.
+INDEX_NAME = '.song_index.json'
+AUDIO_EXTS = ('.wav', '.ogg', '.mp3', '.flac')
+
+# MPEG-1 Layer III bitrates in kbps, by the header's bitrate index.
+MP3_BITRATES = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256,
+                320, 0)
+
+
+def wav_length(f):
+    """Return the length of a wav file from its header."""
+    with wave.open(f) as w:
+        return w.getnframes() / w.getframerate()
+
+
+def ogg_length(f):
+    """Return the length of an Ogg Vorbis or Opus file.
+
+    The sample rate is in the first page, and the granule position of the
+    last page is the number of samples, so only the two ends are read.
+
+    """
+    head = f.read(4096)
+    if head.find(b'\x01vorbis') != -1:
+        i = head.find(b'\x01vorbis') + 7
+        rate = struct.unpack_from('<I', head, i + 5)[0]
+    elif head.find(b'OpusHead') != -1:
+        rate = 48000  # Opus granule positions are always at 48kHz.
+    else:
+        return None
+
+    f.seek(0, os.SEEK_END)
+    f.seek(max(0, f.tell() - 65536))
+    tail = f.read()
+    i = tail.rfind(b'OggS')
+    if i == -1 or not rate:
+        return None
+
+    granule = struct.unpack_from('<q', tail, i + 6)[0]
+    return granule / rate
+
+
+def flac_length(f):
+    """Return the length of a flac file from its STREAMINFO block."""
+    head = f.read(42)
+    if head[:4] != b'fLaC':
+        return None
+
+    # Sample rate is 20 bits, then 3 bits of channels, 5 bits of bits per
+    # sample and 36 bits of total samples.
+    bits = int.from_bytes(head[18:26], 'big')
+    rate = bits >> 44
+    samples = bits & 0xFFFFFFFFF
+    return samples / rate if rate else None
+
+
+def mp3_length(f):
+    """Estimate the length of an mp3 file from the first frame's bitrate.
+
+    Only exact for constant bitrate files.
+
+    """
+    head = f.read(10)
+    start = 0
+    if head[:3] == b'ID3':
+        # Skip the ID3v2 tag. Its size is stored as 4 7-bit bytes.
+        size = 0
+        for b in head[6:10]:
+            size = (size << 7) | (b & 0x7F)
+        start = 10 + size
+
+    f.seek(start)
+    frame = f.read(4)
+    if len(frame) < 4 or frame[0] != 0xFF or (frame[1] & 0xE0) != 0xE0:
+        return None
+
+    bitrate = MP3_BITRATES[frame[2] >> 4] * 1000
+    if not bitrate:
+        return None
+
+    f.seek(0, os.SEEK_END)
+    return (f.tell() - start) * 8 / bitrate
+
+
+READERS = {
+    '.wav': wav_length,
+    '.ogg': ogg_length,
+    '.flac': flac_length,
+    '.mp3': mp3_length
+}
+
+
+def read_info(filename):
+    """Return the format and length in seconds of a song, without decoding.
+
+    The length is None if the header couldn't be read.
+
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    try:
+        with open(filename, 'rb') as f:
+            length = READERS[ext](f)
+    except (OSError, EOFError, KeyError, struct.error, wave.Error):
+        length = None
+
+    return ext[1:], length
+
+
+def load_index(index_file):
+    """Load an index file, or return an empty index."""
+    try:
+        with open(index_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index_file, index):
+    """Write an index file."""
+    with open(index_file, 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+
+def scan(directory, index_file=None, workers=8):
+    """Return {path: entry} for every song under a directory.
+
+    Entries hold the format and length of a song, along with its mtime and
+    size. Songs whose mtime and size haven't changed since the last scan
+    come from the index, the rest are read in parallel. Raises
+    NotADirectoryError if directory isn't one.
+
+    """
+    if not os.path.isdir(directory):
+        raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR),
+                                 directory)
+
+    index_file = index_file or os.path.join(directory, INDEX_NAME)
+    old = load_index(index_file)
+    index = {}
+    stale = list()
+
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            if not name.lower().endswith(AUDIO_EXTS):
+                continue
+
+            filename = os.path.join(root, name)
+            key = os.path.relpath(filename, directory)
+            stat = os.stat(filename)
+
+            entry = old.get(key)
+            if entry and entry['mtime'] == stat.st_mtime and \
+                    entry['size'] == stat.st_size:
+                index[key] = entry
+            else:
+                index[key] = {'mtime': stat.st_mtime, 'size': stat.st_size}
+                stale.append(key)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        paths = [os.path.join(directory, key) for key in stale]
+        for key, (fmt, length) in zip(stale, pool.map(read_info, paths)):
+            index[key]['format'] = fmt
+            index[key]['length'] = length
+
+    if stale or len(index) != len(old):
+        # The index is only a cache, so a directory we can't write to just
+        # means the songs are read again next time.
+        try:
+            save_index(index_file, index)
+        except OSError:
+            pass
+
+    return index
+
+
+def format_entry(name, entry):
+    """Format an index entry. Format: 'NAME (min:sec)'"""
+    if entry['length'] is None:
+        return '{} (?:?)'.format(name)
+
+    m, s = divmod(entry['length'], 60)
+    return '{} ({}:{})'.format(name, int(m), int(s))
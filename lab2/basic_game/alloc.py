@@ -0,0 +1,153 @@
+import gc
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+
+class AllocMonitor(object):
+    """Tracks memory allocated by the game loop and time spent in the GC.
+
+    One frame in every interval is traced line by line. The peak memory
+    traced while each line runs is added to that line, so temporaries that
+    are freed before the frame ends still count against the line that made
+    them. The other frames only record their own peak, and GC pauses are
+    timed through gc.callbacks.
+
+    """
+
+    def __init__(self, interval=60, top=10):
+        self.interval = interval
+        self.top = top
+
+        self.frames = 0
+        self.frame_start = 0
+        self.peak_total = 0
+        self.peak_max = 0
+
+        # Line tracing state for sampled frames.
+        self.sampled = 0
+        self.site = None        # (filename, lineno) being measured
+        self.site_start = 0
+        self.overhead = 0
+        self.site_sizes = Counter()   # {site: bytes}
+        self.site_counts = Counter()  # {site: times it allocated}
+        self.tracer = self.trace      # Bound once so tracing doesn't allocate.
+
+        self.gc_start = 0
+        self.gc_stats = [[0, 0.0, 0.0] for _ in range(3)]  # count, total, max
+
+    def start(self):
+        """Start tracing allocations and timing collections."""
+        tracemalloc.start()
+        gc.callbacks.append(self.on_gc)
+
+        # Reading the traced memory allocates a little itself. Measure how
+        # much so it isn't blamed on every line.
+        self.overhead = min(self.measure_overhead() for _ in range(10))
+
+    def stop(self):
+        """Stop tracing. The results are kept for report()."""
+        sys.settrace(None)
+        if self.on_gc in gc.callbacks:
+            gc.callbacks.remove(self.on_gc)
+        tracemalloc.stop()
+
+    def measure_overhead(self):
+        """Return what a site would be charged for running nothing."""
+        self.restart_site()
+        return tracemalloc.get_traced_memory()[1] - self.site_start
+
+    def restart_site(self):
+        """Start measuring the next site from the current memory.
+
+        The peak is reset last, after every temporary made here is gone.
+
+        """
+        self.site_start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def begin_frame(self):
+        """Called before each frame."""
+        if self.frames % self.interval == 0:
+            self.site = None
+            sys.settrace(self.tracer)
+            self.restart_site()
+        else:
+            self.frame_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+    def end_frame(self):
+        """Called after each frame."""
+        if sys.gettrace() is self.tracer:
+            sys.settrace(None)
+            self.sampled += 1
+        else:
+            peak = tracemalloc.get_traced_memory()[1] - self.frame_start
+            self.peak_total += peak
+            self.peak_max = max(self.peak_max, peak)
+
+        self.frames += 1
+
+    def trace(self, frame, event, arg):
+        """Charge the memory used since the last event to the last site.
+
+        Registered with sys.settrace for sampled frames. Calls and returns
+        move the site to the callee and back to the caller's line.
+
+        """
+        used = tracemalloc.get_traced_memory()[1] - self.site_start
+        if self.site is not None and used > self.overhead:
+            self.site_sizes[self.site] += used - self.overhead
+            self.site_counts[self.site] += 1
+        del used
+
+        if event == 'return':
+            frame = frame.f_back
+
+        if frame is None or frame.f_code.co_filename == __file__:
+            self.site = None
+        else:
+            self.site = (frame.f_code.co_filename, frame.f_lineno)
+
+        # Inlined restart_site(), calling it would leave a bound method
+        # behind to be freed after the peak is reset.
+        self.site_start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        return self.tracer
+
+    def on_gc(self, phase, info):
+        """Time a collection. Registered with gc.callbacks."""
+        if phase == 'start':
+            self.gc_start = time.perf_counter()
+            return
+
+        ms = (time.perf_counter() - self.gc_start) * 1000
+        stats = self.gc_stats[info['generation']]
+        stats[0] += 1
+        stats[1] += ms
+        stats[2] = max(stats[2], ms)
+
+    def report(self):
+        """Return the results as a list of lines."""
+        lines = ['Allocations over {} frames'.format(self.frames)]
+
+        if self.sampled:
+            lines.append('Allocated per frame by line ({} sampled frames):'
+                         .format(self.sampled))
+            for site, size in self.site_sizes.most_common(self.top):
+                lines.append('  {:<48} {:>10.1f} B {:>8.1f} times'.format(
+                    '{}:{}'.format(*site), size / self.sampled,
+                    self.site_counts[site] / self.sampled))
+
+        unsampled = self.frames - self.sampled
+        if unsampled:
+            lines.append('Peak memory per frame: avg {:.0f} B, max {} B'
+                         .format(self.peak_total / unsampled, self.peak_max))
+
+        for gen, (count, total, worst) in enumerate(self.gc_stats):
+            if count:
+                lines.append('GC gen {}: {} collections, avg {:.3f} ms, '
+                             'max {:.3f} ms'.format(gen, count, total / count,
+                                                    worst))
+        return lines
@@ -1,6 +1,10 @@
+import gc
 import sys
 import pygame
 from .event import EventManager
+from .assets import AssetManager
+from .render import RenderQueue
+from .alloc import AllocMonitor
 
 
 class App(object):
@@ -11,6 +15,12 @@ class App(object):
         self.running = False
 
         pygame.init()
+
+        # Assets start loading in the background while the window opens.
+        self.assets = AssetManager()
+        self.game.assets = self.assets
+        self.game.preload()
+
         pygame.display.set_mode(cfg['SCR_SIZE'], cfg['SCR_FLAGS'])
         pygame.display.set_caption(cfg['SCR_CAP'])
 
@@ -22,8 +32,40 @@ class App(object):
         self.clock = pygame.time.Clock()
 
         self.game.scr_surf = pygame.display.get_surface()
+
+        # Everything drawn in a frame goes to the screen in one blits call.
+        self.render_queue = RenderQueue(self.game.scr_surf)
+        self.game.render_queue = self.render_queue
         self.game.build()
 
+        # Everything is subscribed now, drop the rest before it's queued.
+        self.evt_mgr.block_unused()
+
+        self.tune_gc(cfg)
+
+        # Optional allocation and GC monitoring. Costs a single check per
+        # frame when turned off.
+        self.alloc_monitor = None
+        if cfg.get('ALLOC_MONITOR', False):
+            self.alloc_monitor = AllocMonitor(cfg.get('ALLOC_INTERVAL', 60),
+                                              cfg.get('ALLOC_TOP', 10))
+
+    def tune_gc(self, cfg):
+        """Apply the GC settings from the config.
+
+        GC_THRESHOLDS replaces the collection thresholds. GC_FREEZE moves
+        everything created while building into the permanent generation, so
+        collections during the game loop don't have to walk it.
+
+        """
+        thresholds = cfg.get('GC_THRESHOLDS')
+        if thresholds:
+            gc.set_threshold(*thresholds)
+
+        if cfg.get('GC_FREEZE', False):
+            gc.collect()
+            gc.freeze()
+
     def register_events(self):
         """Register a few base event handlers."""
         self.evt_mgr.subscribe(pygame.QUIT, self.shutdown)
@@ -33,20 +75,40 @@ class App(object):
         """Kicks off the game loop."""
         self.running = True
 
+        if self.alloc_monitor:
+            self.alloc_monitor.start()
+
         while self.running:
             self.clock.tick(60)  # Limit to 60FPS
 
-            self.evt_mgr.dispatch(pygame.event.get())
-
-            self.game.update(self.clock.get_time())
+            if self.alloc_monitor:
+                self.frame_monitored(self.clock.get_time())
+            else:
+                self.frame(self.clock.get_time())
 
-            self.game.scr_surf.fill((0, 0, 0))
-            self.game.draw()
-            pygame.display.update()
+        if self.alloc_monitor:
+            self.alloc_monitor.stop()
+            print('\n'.join(self.alloc_monitor.report()))
 
         pygame.quit()
         sys.exit()
 
+    def frame(self, dt):
+        """Run a single frame of the game loop."""
+        self.evt_mgr.dispatch(pygame.event.get())
+
+        self.game.update(dt)
+
+        self.game.scr_surf.fill((0, 0, 0))
+        self.game.draw()
+        pygame.display.update()
+
+    def frame_monitored(self, dt):
+        """Same as frame, but tracking its allocations."""
+        self.alloc_monitor.begin_frame()
+        self.frame(dt)
+        self.alloc_monitor.end_frame()
+
     def shutdown(self, evt):
         """Performs any cleanup operations and stop the game loop."""
         self.running = False
@@ -0,0 +1,152 @@
+import os
+import json
+import pygame
+
+
+class Atlas(object):
+    """Packs many small images into a few large surfaces (pages).
+
+    Images are placed with a shelf packer: left to right along shelves as
+    tall as the first image on them, starting a new shelf below when a row
+    is full and a new page when a page is full. Sprites then keep the page
+    and the rect of their image, and blit with an area, so every sprite in
+    the atlas draws from the same surface.
+
+    """
+
+    def __init__(self, page_size=(512, 512), padding=1, alpha=False):
+        self.page_size = page_size
+        self.padding = padding
+        self.alpha = alpha
+        self.pages = list()
+        self.shelves = list()  # [[[y, height, next x], ...], ...] by page
+        self.regions = {}      # {name: (page index, Rect)}
+
+    def __contains__(self, name):
+        return name in self.regions
+
+    def add(self, name, surf):
+        """Copy an image into the atlas. Returns its (page, rect)."""
+        w, h = surf.get_size()
+        i, x, y = self.place(w, h)
+
+        rect = pygame.Rect(x, y, w, h)
+        if surf.get_flags() & pygame.SRCALPHA:
+            # Copy the pixels as they are instead of blending them with the
+            # empty page, which would darken anything partly transparent.
+            self.pages[i].blit(surf, rect,
+                               special_flags=pygame.BLEND_RGBA_MAX)
+        else:
+            self.pages[i].blit(surf, rect)
+        self.regions[name] = (i, rect)
+        return self.pages[i], rect
+
+    def add_scaled(self, name, surf, size):
+        """Add a scaled copy of an image."""
+        return self.add(name, pygame.transform.scale(surf, size))
+
+    def add_tinted(self, name, surf, colour):
+        """Add a copy of an image with every pixel multiplied by colour."""
+        tinted = surf.copy()
+        tinted.fill(colour, special_flags=pygame.BLEND_RGB_MULT)
+        return self.add(name, tinted)
+
+    def region(self, name):
+        """Return the (page, rect) of an image. Raises KeyError if missing."""
+        i, rect = self.regions[name]
+        return self.pages[i], rect
+
+    def place(self, w, h):
+        """Find room for a w by h image. Returns (page index, x, y)."""
+        page_w, page_h = self.page_size
+        w += self.padding
+        h += self.padding
+        if w > page_w or h > page_h:
+            raise ValueError('{}x{} image is bigger than an atlas page'.format(
+                w, h))
+
+        for i, shelves in enumerate(self.shelves):
+            if shelves is None:  # Closed by convert().
+                continue
+
+            for shelf in shelves:
+                y, height, x = shelf
+                if h <= height and x + w <= page_w:
+                    shelf[2] += w
+                    return i, x, y
+
+            top = shelves[-1][0] + shelves[-1][1] if shelves else 0
+            if top + h <= page_h:
+                shelves.append([top, h, w])
+                return i, 0, top
+
+        self.pages.append(self.new_page(self.page_size))
+        self.shelves.append([[0, h, w]])
+        return len(self.pages) - 1, 0, 0
+
+    def new_page(self, size):
+        """Return an empty page surface."""
+        if self.alpha:
+            return pygame.Surface(size, pygame.SRCALPHA)
+        return pygame.Surface(size)
+
+    def convert(self):
+        """Crop the pages to what is used and convert them for the display.
+
+        Nothing more is packed into the existing pages afterwards, images
+        added later go to new pages.
+
+        """
+        has_display = pygame.display.get_surface() is not None
+        for i, page in enumerate(self.pages):
+            rects = [rect for j, rect in self.regions.values() if j == i]
+            if rects:
+                used = rects[0].unionall(rects[1:])
+                page = page.subsurface(0, 0, used.right, used.bottom).copy()
+
+            if has_display:
+                page = page.convert_alpha() if self.alpha else page.convert()
+            self.pages[i] = page
+            self.shelves[i] = None
+
+    def save(self, filename):
+        """Save the atlas as a JSON index and one PNG per page."""
+        base = os.path.splitext(filename)[0]
+        page_files = list()
+        for i, page in enumerate(self.pages):
+            page_file = '{}_{}.png'.format(base, i)
+            pygame.image.save(page, page_file)
+            page_files.append(os.path.basename(page_file))
+
+        data = {
+            'page_size': self.page_size,
+            'padding': self.padding,
+            'alpha': self.alpha,
+            'pages': page_files,
+            'regions': {name: [i, rect.x, rect.y, rect.w, rect.h]
+                        for name, (i, rect) in self.regions.items()}
+        }
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    @classmethod
+    def load(cls, filename):
+        """Load an atlas saved by save(). Its pages are closed to packing.
+
+        Call convert() once the display is set up.
+
+        """
+        with open(filename) as f:
+            data = json.load(f)
+
+        atlas = cls(tuple(data['page_size']), data['padding'], data['alpha'])
+        directory = os.path.dirname(filename)
+        for page_file in data['pages']:
+            atlas.pages.append(pygame.image.load(
+                os.path.join(directory, page_file)))
+            atlas.shelves.append(None)
+
+        for name, (i, x, y, w, h) in data['regions'].items():
+            atlas.regions[name] = (i, pygame.Rect(x, y, w, h))
+
+        return atlas
@@ -0,0 +1,147 @@
+import sys
+import json
+import timeit
+import platform
+import argparse
+from collections import OrderedDict
+
+
+class Suite(object):
+    """A named set of microbenchmarks with JSON baselines.
+
+    Each benchmark is added as a setup function that builds whatever it
+    needs and returns the function to time, so nothing is built until the
+    benchmark runs. Times are per call, in microseconds.
+
+    """
+
+    def __init__(self, repeat=5, min_time=0.2):
+        self.repeat = repeat
+        self.min_time = min_time
+        self.benchmarks = OrderedDict()  # {name: setup}
+
+    def add(self, name, setup):
+        """Add a benchmark. setup() returns the function to time."""
+        self.benchmarks[name] = setup
+
+    def bench(self, name):
+        """Decorator version of add."""
+        def decorator(setup):
+            self.add(name, setup)
+            return setup
+        return decorator
+
+    def time(self, func):
+        """Time a function. Returns its min and median time per call."""
+        timer = timeit.Timer(func)
+
+        # Find a call count that takes at least min_time per repeat.
+        number = 1
+        while timer.timeit(number) < self.min_time:
+            number *= 2
+
+        times = sorted(t / number * 1e6
+                       for t in timer.repeat(self.repeat, number))
+        return {
+            'min': times[0],
+            'median': times[len(times) // 2],
+            'number': number
+        }
+
+    def run(self, match=None, out=sys.stdout):
+        """Run every benchmark whose name contains match.
+
+        Returns {name: result}, and prints each result as it finishes.
+
+        """
+        results = OrderedDict()
+        for name, setup in self.benchmarks.items():
+            if match and match not in name:
+                continue
+
+            results[name] = self.time(setup())
+            print('{:<32} {:>12.2f} us'.format(name, results[name]['median']),
+                  file=out)
+            out.flush()
+
+        return results
+
+
+def save(filename, results):
+    """Write results to a JSON baseline file."""
+    data = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results
+    }
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def load(filename):
+    """Return the results from a JSON baseline file."""
+    with open(filename) as f:
+        return json.load(f)['results']
+
+
+def compare(baseline, results, threshold=0.1):
+    """Compare results against a baseline.
+
+    Returns a list of (name, old, new, ratio) for every benchmark whose
+    median got slower by more than threshold (a fraction).
+
+    """
+    regressions = list()
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+
+        ratio = result['median'] / old['median']
+        if ratio > 1 + threshold:
+            regressions.append((name, old['median'], result['median'], ratio))
+
+    return regressions
+
+
+def get_args(description):
+    """Init the parser and return the arguments."""
+    parser = argparse.ArgumentParser(description=description)
+
+    parser.add_argument('-k', '--match',
+                        help='only run benchmarks whose name contains this')
+    parser.add_argument('-s', '--save', metavar='FILE',
+                        help='save the results as a baseline')
+    parser.add_argument('-c', '--compare', metavar='FILE',
+                        help='compare the results against a baseline')
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help='slowdown that counts as a regression '
+                             '(default: 0.1)')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of times to repeat each benchmark')
+    return parser.parse_args()
+
+
+def main(suite, description):
+    """Run a suite from the command line. Returns the exit status."""
+    args = get_args(description)
+    suite.repeat = args.repeat
+
+    # Load the baseline first so a bad file fails before the long part.
+    baseline = load(args.compare) if args.compare else None
+
+    results = suite.run(args.match)
+
+    if args.save:
+        save(args.save, results)
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        for name, old, new, ratio in regressions:
+            print('REGRESSION {}: {:.2f} us -> {:.2f} us ({:+.0%})'.format(
+                name, old, new, ratio - 1))
+        if regressions:
+            return 1
+        print('No regressions beyond {:.0%}'.format(args.threshold))
+
+    return 0
@@ -0,0 +1,82 @@
+class CollisionWorld(object):
+    """Finds overlapping entities using a spatial hash broadphase.
+
+    Entities are registered once and need a rect attribute. Each call to
+    update() buckets them into a grid of cell_size squares, only tests
+    entities sharing a cell, and reports every overlapping pair once through
+    the callbacks:
+
+        on_enter(a, b)  the pair started overlapping this frame
+        on_stay(a, b)   the pair was already overlapping
+        on_exit(a, b)   the pair stopped overlapping (or one was removed)
+
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.entities = {}  # {id: entity}
+        self.pairs = set()  # {(id, id)} overlapping last update
+
+        self.on_enter = lambda a, b: None
+        self.on_stay = lambda a, b: None
+        self.on_exit = lambda a, b: None
+
+    def add(self, entity):
+        """Register an entity with the world."""
+        self.entities[id(entity)] = entity
+
+    def remove(self, entity):
+        """Unregister an entity, ending any collisions it was part of."""
+        key = id(entity)
+        if self.entities.pop(key, None) is None:
+            return
+
+        for pair in [p for p in self.pairs if key in p]:
+            self.pairs.remove(pair)
+            a, b = pair
+            self.on_exit(self.entities.get(a, entity),
+                         self.entities.get(b, entity))
+
+    def find_pairs(self):
+        """Return the set of (id, id) pairs whose rects overlap."""
+        cell = self.cell_size
+        grid = {}
+        for key, entity in self.entities.items():
+            rect = entity.rect
+            for cx in range(rect.left // cell, (rect.right - 1) // cell + 1):
+                for cy in range(rect.top // cell,
+                                (rect.bottom - 1) // cell + 1):
+                    bucket = grid.get((cx, cy))
+                    if bucket is None:
+                        grid[(cx, cy)] = [key]
+                    else:
+                        bucket.append(key)
+
+        entities = self.entities
+        pairs = set()
+        for bucket in grid.values():
+            if len(bucket) < 2:
+                continue
+
+            for i, a in enumerate(bucket):
+                rect = entities[a].rect
+                for b in bucket[i + 1:]:
+                    pair = (a, b) if a < b else (b, a)
+                    if pair not in pairs and rect.colliderect(entities[b].rect):
+                        pairs.add(pair)
+
+        return pairs
+
+    def update(self):
+        """Find this frame's collisions and call the callbacks."""
+        pairs = self.find_pairs()
+        entities = self.entities
+
+        for a, b in pairs - self.pairs:
+            self.on_enter(entities[a], entities[b])
+        for a, b in pairs & self.pairs:
+            self.on_stay(entities[a], entities[b])
+        for a, b in self.pairs - pairs:
+            self.on_exit(entities[a], entities[b])
+
+        self.pairs = pairs
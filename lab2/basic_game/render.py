@@ -0,0 +1,41 @@
+class RenderQueue(object):
+    """Collects the blits of a frame and submits them in a single call.
+
+    Objects add draw commands instead of blitting to the target directly.
+    flush() sorts them by layer, lowest first, and hands them all to
+    Surface.blits, so drawing hundreds of sprites costs one call into
+    pygame. Commands on the same layer are drawn in the order added.
+
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.layers = {}  # {layer: [(surf, dest, area), ...]}
+
+    def add(self, surf, dest, area=None, layer=0):
+        """Queue a blit of surf to dest on the target."""
+        cmds = self.layers.get(layer)
+        if cmds is None:
+            cmds = self.layers[layer] = list()
+        cmds.append((surf, dest, area))
+
+    def __len__(self):
+        return sum(len(cmds) for cmds in self.layers.values())
+
+    def flush(self, doreturn=False):
+        """Draw and clear everything queued.
+
+        Returns the rects drawn to, in layer order, if doreturn is set.
+        Otherwise returns None, which saves building the rects.
+
+        """
+        if len(self.layers) == 1:
+            cmds = next(iter(self.layers.values()))
+        else:
+            cmds = list()
+            for layer in sorted(self.layers):
+                cmds.extend(self.layers[layer])
+        self.layers.clear()
+
+        rects = self.target.blits(cmds, doreturn)
+        return rects if doreturn else None
@@ -0,0 +1,84 @@
+import pygame
+
+
+class SoundPool(object):
+    """Plays sounds on a fixed set of reserved mixer channels.
+
+    A sound can't be retriggered until its cooldown (ms) has passed, and
+    only max_voices copies of it play at once. When every channel is busy,
+    a sound steals the channel of the lowest priority sound playing, as
+    long as that is lower than its own priority.
+
+    """
+
+    def __init__(self, channels=4, cooldown=150, max_voices=1):
+        if pygame.mixer.get_init():
+            # Reserve the first channels so Sound.play() elsewhere can't use
+            # them.
+            if pygame.mixer.get_num_channels() < channels:
+                pygame.mixer.set_num_channels(channels)
+            pygame.mixer.set_reserved(channels)
+        else:
+            # Without a mixer the pool has no channels and drops every sound.
+            channels = 0
+
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        self.voices = [(None, 0)] * channels  # (name, priority) per channel
+
+        self.sounds = {}       # {name: (Sound, priority, cooldown, voices)}
+        self.last_played = {}  # {name: ticks}
+        self.cooldown = cooldown
+        self.max_voices = max_voices
+
+    def add(self, name, sound, priority=0, cooldown=None, max_voices=None):
+        """Add a sound to the pool under the given name."""
+        if cooldown is None:
+            cooldown = self.cooldown
+        if max_voices is None:
+            max_voices = self.max_voices
+        self.sounds[name] = (sound, priority, cooldown, max_voices)
+
+    def play(self, name, priority=None):
+        """Play a sound if it isn't cooling down and a channel is free.
+
+        Returns the Channel used, or None if the sound was dropped. Raises
+        KeyError if no sound was added under name, unless there is no mixer.
+
+        """
+        if not self.channels:
+            return None
+
+        sound, default_priority, cooldown, max_voices = self.sounds[name]
+        if priority is None:
+            priority = default_priority
+
+        now = pygame.time.get_ticks()
+        last = self.last_played.get(name)
+        if last is not None and now - last < cooldown:
+            return None
+
+        busy = [channel.get_busy() for channel in self.channels]
+        playing = sum(1 for i, (voice, p) in enumerate(self.voices)
+                      if busy[i] and voice == name)
+        if playing >= max_voices:
+            return None
+
+        i = self.find_channel(busy, priority)
+        if i is None:
+            return None
+
+        channel = self.channels[i]
+        channel.play(sound)
+        self.voices[i] = (name, priority)
+        self.last_played[name] = now
+        return channel
+
+    def find_channel(self, busy, priority):
+        """Return a free channel, or the one to steal. None if neither."""
+        if not all(busy):
+            return busy.index(False)
+
+        lowest = min(range(len(self.voices)), key=lambda i: self.voices[i][1])
+        if self.voices[lowest][1] < priority:
+            return lowest
+        return None
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+import os
+import sys
+import random
+
+# Benchmarks never open a real window or audio device.
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+from basic_game.app import App
+from basic_game.benchmark import Suite, main
+from basic_game.collision import CollisionWorld
+from basic_game.entities import EntityStore
+from basic_game.event import EventManager
+from mario import Mario
+from part1 import Game
+
+ENTITY_COUNTS = (10, 100, 1000, 10000)
+SCR_SIZES = ((640, 480), (1024, 768), (1920, 1080))
+FLOOD_SIZE = 10000
+
+suite = Suite()
+
+
+def bench_dispatch(evt_types):
+    """Return a benchmark dispatching a flood of events of the given types."""
+    def setup():
+        evt_mgr = EventManager()
+        for evt_type in (pygame.KEYDOWN, pygame.MOUSEMOTION,
+                         pygame.JOYAXISMOTION):
+            for _ in range(4):
+                evt_mgr.subscribe(evt_type, lambda evt: None)
+
+        evts = [pygame.event.Event(evt_types[i % len(evt_types)],
+                                   key=pygame.K_a, pos=(i, i), rel=(1, 1),
+                                   buttons=(0, 0, 0), joy=0, instance_id=0,
+                                   axis=i % 2, value=0.5)
+                for i in range(FLOOD_SIZE)]
+        return lambda: evt_mgr.dispatch(evts)
+    return setup
+
+
+suite.add('dispatch_keydown', bench_dispatch([pygame.KEYDOWN]))
+suite.add('dispatch_mixed', bench_dispatch([pygame.KEYDOWN,
+                                            pygame.MOUSEMOTION,
+                                            pygame.JOYAXISMOTION,
+                                            pygame.USEREVENT]))
+suite.add('dispatch_joy_axis', bench_dispatch([pygame.JOYAXISMOTION]))
+
+
+def make_marios(n):
+    """Return a store and n Marios scattered over an area that grows with n.
+
+    The area grows with n so the number of overlaps per Mario stays about
+    the same.
+
+    """
+    rng = random.Random(0)
+    side = int((n ** 0.5) * 128)
+    surf = pygame.Surface((64, 64))
+    store = EntityStore(n)
+
+    marios = list()
+    for i in range(n):
+        pos = (rng.uniform(0, side), rng.uniform(0, side))
+        mario = Mario(str(i), surf, pygame.math.Vector2(pos), store)
+        mario.set_dir(pygame.math.Vector2(rng.uniform(-1, 1),
+                                          rng.uniform(-1, 1)))
+        marios.append(mario)
+
+    return store, marios
+
+
+def bench_marios(n):
+    """Return a benchmark moving n Marios that share a store."""
+    def setup():
+        store, marios = make_marios(n)
+
+        def update():
+            store.normalize()
+            store.integrate(1000 / 60)
+            for mario in marios:
+                mario.update(1000 / 60)
+        return update
+    return setup
+
+
+def bench_collisions(n):
+    """Return a benchmark finding overlaps between n Marios."""
+    def setup():
+        store, marios = make_marios(n)
+        world = CollisionWorld(cell_size=64)
+        for mario in marios:
+            mario.update(0)
+            world.add(mario)
+        return world.update
+    return setup
+
+
+for n in ENTITY_COUNTS:
+    suite.add('mario_update_{}'.format(n), bench_marios(n))
+for n in ENTITY_COUNTS:
+    suite.add('collisions_{}'.format(n), bench_collisions(n))
+
+
+def bench_frame(scr_size):
+    """Return a benchmark running full App frames at a screen size."""
+    def setup():
+        cfg = {
+            'SCR_SIZE': scr_size,
+            'SCR_CAP': '',
+            'SCR_FLAGS': 0
+        }
+        app = App(cfg, Game())
+        return lambda: app.frame(1000 / 60)
+    return setup
+
+
+for size in SCR_SIZES:
+    suite.add('frame_{}x{}'.format(*size), bench_frame(size))
+
+
+if __name__ == '__main__':
+    pygame.init()
+    sys.exit(main(suite, 'Lab 2: Benchmarks'))
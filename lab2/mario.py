@@ -1,50 +1,48 @@
 import pygame
 from pygame.math import Vector2
+from basic_game.entities import EntityStore, VecView
 
 
 class Mario(object):
     """Bundles together some basic character functionality."""
 
-    def __init__(self, name, surf, pos=Vector2()):
+    def __init__(self, name, surf, pos=Vector2(), store=None, area=None):
         if not surf:
             raise ValueError('no surface')
 
         self.name = name
-        self.surf = surf
-        self.pos = pos
-        self.dir = Vector2()
+        self.page = surf
+        self.area = area
+        self.surf = surf if area is None else surf.subsurface(area)
+
+        self.owns_store = store is None
+        self.store = EntityStore(1) if store is None else store
+        self.index = self.store.add(pos)
+        self.pos = VecView(self.store, 'pos', self.index)
+        # Mario moves one pixel per ms, so his velocity is his direction.
+        self.dir = VecView(self.store, 'vel', self.index)
         self.rect = pygame.Rect(self.pos, self.surf.get_size())
 
-        #self.enemies = dict()  # {str: Rect}
-        self.enemies = list()
-        self.on_collision = lambda x: None
-
-    def check_collisions(self):
-        """Check for any collisions and call the collision handler."""
-        i = self.rect.collidelist(self.enemies)
-        if i != -1:
-            self.on_collision(self.enemies[i])
-
     def update(self, dt):
         """Perform any logic updates here."""
-        self.pos += self.dir * dt
+        if self.owns_store:
+            self.store.integrate(dt)
 
         # Update the rect
         self.rect.left = self.pos.x
         self.rect.top = self.pos.y
 
-        self.check_collisions()
-
-    def draw(self, dest_surf):
-        """Blit Mario to the destination surface"""
-        dest_surf.blit(self.surf, self.pos_to_tuple())
+    def draw(self, queue, layer=0):
+        """Queue Mario to be drawn."""
+        queue.add(self.page, self.pos_to_tuple(), self.area, layer)
 
     def set_dir(self, new_dir):
-        # Normalize incoming dir if needed
-        if new_dir.length() > 0 and not new_dir.is_normalized():
-            self.dir = new_dir.normalize()
-        else:
-            self.dir = new_dir
+        """Set the direction. The store owner normalizes it."""
+        self.dir.x = new_dir.x
+        self.dir.y = new_dir.y
+
+        if self.owns_store:
+            self.store.normalize()
 
     def pos_to_tuple(self):
         """Return position as a (x,y) tuple."""
@@ -1,8 +1,13 @@
 #!/usr/bin/env python
 import sys
+import argparse
 import pygame
 from pygame.math import Vector2
 from basic_game.app import App
+from basic_game.atlas import Atlas
+from basic_game.collision import CollisionWorld
+from basic_game.entities import EntityStore
+from basic_game.sound import SoundPool
 from mario import Mario
 
 
@@ -13,15 +18,26 @@ class Game(object):
     MOUSE = 1
     JOY = 2
 
+    # Sounds from buttons can cut off collision and screen edge sounds.
+    INPUT_PRIORITY = 1
+
     def __init__(self):
         self.evt_mgr = None   # Injected by App
         self.scr_surf = None  # Injected by App
+        self.render_queue = None  # Injected by App
+        self.assets = None    # Injected by App
 
         self.sounds = list()
+        self.sound_pool = None
+        self.atlas = Atlas(alpha=True)
         self.mario_img = None
+        self.mario_area = None
         self.marios = list()
+        self.entities = EntityStore()
+        self.world = CollisionWorld(cell_size=64)
 
         self.input_vec = Vector2()
+        self.mouse_vec = Vector2()
         self.joystick = None
         self.joy_vec = Vector2()
 
@@ -30,30 +46,45 @@ class Game(object):
         self.marios[Game.KEY].set_dir(self.input_vec)
         self.marios[Game.JOY].set_dir(self.joy_vec)
 
-        # Get the unit vector pointing to the mouse from mouse mario's
-        # current location.
-        new_dir = Vector2(pygame.mouse.get_pos()) - self.marios[Game.MOUSE].pos
+        # Get the vector pointing to the mouse from mouse mario's current
+        # location.
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        pos = self.marios[Game.MOUSE].pos
+        self.mouse_vec.update(mouse_x - pos.x, mouse_y - pos.y)
 
         # Keep Mario from moving when the mouse stops.
         dead_zone = 10
-        if new_dir.length() > dead_zone:
-            self.marios[Game.MOUSE].set_dir(new_dir)
-        else:
-            self.marios[Game.MOUSE].set_dir(Vector2(0, 0))
+        if self.mouse_vec.length_squared() <= dead_zone ** 2:
+            self.mouse_vec.update(0, 0)
+        self.marios[Game.MOUSE].set_dir(self.mouse_vec)
+
+        # Normalize, clamp and move every Mario at once.
+        self.entities.normalize()
+        hit_scr_edge = self.clamp_to_screen()
+        self.entities.integrate(dt)
 
         for i, mario in enumerate(self.marios):
-            hit_scr_edge = self.clamp_to_screen(mario)
-            if hit_scr_edge:
+            if hit_scr_edge[mario.index]:
                 self.safely_play_sound(i)
             mario.update(dt)
 
-        # Reset input vec.
-        self.input_vec = pygame.math.Vector2()
+        self.world.update()
+
+        # Reset input vec. Reused so the loop doesn't make garbage.
+        self.input_vec.update(0, 0)
 
     def draw(self):
         """Blit surfaces to the display surface."""
         for m in self.marios:
-            m.draw(self.scr_surf)
+            m.draw(self.render_queue)
+        self.render_queue.flush()
+
+    def preload(self):
+        """Called before the window is created. Starts loading assets."""
+        self.assets.preload(
+            images=['mario.png'],
+            sounds=['sound{}.ogg'.format(i) for i in range(4)]
+        )
 
     def build(self):
         """Called before the game loop starts and after pygame is initialized."""
@@ -62,25 +93,26 @@ class Game(object):
         self.load_sounds()
 
         top_left = Vector2(5, 5)
-        top_right = Vector2(self.scr_surf.get_width() - self.mario_img.get_width() - 5, 5)
-        bottom_left = Vector2(5, self.scr_surf.get_height() - self.mario_img.get_height() - 5)
+        top_right = Vector2(self.scr_surf.get_width() - self.mario_area.width - 5, 5)
+        bottom_left = Vector2(5, self.scr_surf.get_height() - self.mario_area.height - 5)
 
         try:
             self.marios.extend([
-                Mario("key", self.mario_img, top_left),
-                Mario("mouse", self.mario_img, top_right),
-                Mario("joy", self.mario_img, bottom_left)
+                Mario("key", self.mario_img, top_left, self.entities,
+                      self.mario_area),
+                Mario("mouse", self.mario_img, top_right, self.entities,
+                      self.mario_area),
+                Mario("joy", self.mario_img, bottom_left, self.entities,
+                      self.mario_area)
             ])
         except ValueError:
             print("Couldn't create marios")
             sys.exit(-1)
 
+        # Register the Marios with the collision world.
         for m in self.marios:
-            # Register each Mario with the other two.
-            others = [o for o in self.marios if o != m]
-            m.enemies.extend(others)
-            # Add the collision callback.
-            m.on_collision = self.handle_collisions
+            self.world.add(m)
+        self.world.on_enter = self.on_mario_collision
 
         # Use key repeat
         pygame.key.set_repeat(250, 25)
@@ -91,9 +123,13 @@ class Game(object):
             self.joystick = pygame.joystick.Joystick(0)
             self.joystick.init()
 
+    def on_mario_collision(self, a, b):
+        """Both Marios play their sound when they start overlapping."""
+        self.handle_collisions(a)
+        self.handle_collisions(b)
+
     def handle_collisions(self, mario):
         """Fire off a sound based on the mario who was hit."""
-        # TODO: Timer to prevent spamming a sound
         if mario.name == 'key':
             self.safely_play_sound(0)
         elif mario.name == 'mouse':
@@ -101,28 +137,14 @@ class Game(object):
         elif mario.name == 'joy':
             self.safely_play_sound(2)
 
-    def clamp_to_screen(self, mario):
-        """Limits the vector to the screen bounds.
+    def clamp_to_screen(self):
+        """Limits every Mario's position to the screen bounds.
 
-        Returns true when mario was outside the screen.
+        Returns an array of flags, true for each Mario that was outside the
+        screen, indexed by his store index.
 
         """
-        def clamp(x, minimum, maximum):
-            """Clamp a single value to a range."""
-            return max(minimum, min(x, maximum))
-
-        scr = Vector2(self.scr_surf.get_size())
-        new_pos = Vector2(
-            clamp(mario.pos.x, 0, scr.x),
-            clamp(mario.pos.y, 0, scr.y)
-        )
-
-        # Check if any change was made
-        if new_pos == mario.pos:
-            return False
-        else:
-            mario.pos = new_pos
-            return True
+        return self.entities.clamp((0, 0), self.scr_surf.get_size())
 
     def update_key_input_vec(self, evt):
         """Update the keyboard input vector on key down."""
@@ -154,46 +176,58 @@ class Game(object):
     def play_key_sounds(self, evt):
         """Play sounds for number keys 1-4."""
         if evt.key == pygame.K_1:
-            self.safely_play_sound(0)
+            self.safely_play_sound(0, Game.INPUT_PRIORITY)
         elif evt.key == pygame.K_2:
-            self.safely_play_sound(1)
+            self.safely_play_sound(1, Game.INPUT_PRIORITY)
         elif evt.key == pygame.K_3:
-            self.safely_play_sound(2)
+            self.safely_play_sound(2, Game.INPUT_PRIORITY)
         elif evt.key == pygame.K_4:
-            self.safely_play_sound(3)
+            self.safely_play_sound(3, Game.INPUT_PRIORITY)
 
     def play_mouse_sound(self, evt):
         """Play sounds for mouse buttons."""
-        self.safely_play_sound(evt.button)
+        self.safely_play_sound(evt.button, Game.INPUT_PRIORITY)
 
     def play_joy_sound(self, evt):
         """Play sounds for joystick buttons."""
-        self.safely_play_sound(evt.button)
+        self.safely_play_sound(evt.button, Game.INPUT_PRIORITY)
+
+    def safely_play_sound(self, index, priority=0):
+        """Play a sound through the pool, catching any exceptions.
+
+        The pool drops the sound if it is cooling down or every channel is
+        busy with a higher priority sound.
 
-    def safely_play_sound(self, index):
-        """Wraps a call to Sound.play() in a try/except."""
+        """
         try:
-            self.sounds[index].play()
-        except IndexError:
+            self.sound_pool.play(index, priority)
+        except KeyError:
             print('Error: sound {} not loaded.'.format(index))
         except pygame.error:
             print('Error: could not play sound {}.'.format(index))
 
     def load_mario_img(self):
-        """Load mario and scale him."""
-        self.mario_img = pygame.image.load("mario.png")
-        self.mario_img = pygame.transform.scale(self.mario_img, (64, 64))
+        """Load mario, scale him and pack him into the atlas."""
+        # Copy the cached image, so the color key isn't set on the shared one.
+        img = self.assets.image('mario.png', (64, 64), alpha=True).copy()
 
         # Use (0,0) as color key
-        self.mario_img.set_colorkey(self.mario_img.get_at((0, 0)))
+        img.set_colorkey(img.get_at((0, 0)))
+
+        self.atlas.add('mario', img)
+        self.atlas.convert()
+        self.mario_img, self.mario_area = self.atlas.region('mario')
 
     def load_sounds(self):
         """Load all required sound effects."""
+        self.sound_pool = SoundPool(channels=4, cooldown=250)
+
         for i in range(4):
             try:
-                sound = pygame.mixer.Sound(file='sound{}.ogg'.format(i))
+                sound = self.assets.sound('sound{}.ogg'.format(i))
                 self.sounds.append(sound)
-            except pygame.error:
+                self.sound_pool.add(i, sound)
+            except (pygame.error, FileNotFoundError):
                 # TODO: Should this cause the game to shutdown?
                 continue
 
@@ -208,12 +242,27 @@ class Game(object):
         ])
 
 
+def get_args():
+    """Init the parser and return the arguments."""
+    parser = argparse.ArgumentParser(description='Lab 2: Marios')
+
+    parser.add_argument('--alloc', action='store_true',
+                        help='report allocations and GC pauses on exit')
+    parser.add_argument('--gc-freeze', action='store_true',
+                        help='freeze objects created before the game loop')
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
+    args = get_args()
+
     # Create the configuration dict.
     cfg = {
         'SCR_SIZE': (640, 480),
         'SCR_CAP': 'Pygame and Python 3 Test',
-        'SCR_FLAGS': pygame.HWSURFACE | pygame.DOUBLEBUF
+        'SCR_FLAGS': pygame.HWSURFACE | pygame.DOUBLEBUF,
+        'ALLOC_MONITOR': args.alloc,
+        'GC_FREEZE': args.gc_freeze
     }
 
     # Initialize the app and run it.
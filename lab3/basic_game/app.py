@@ -1,6 +1,11 @@
 import sys
+import time
 import pygame
 from .event import EventManager
+from .profiler import FrameProfiler
+from .log import start_writer
+from .assets import AssetManager
+from .render import RenderQueue
 
 
 class App(object):
@@ -9,10 +14,32 @@ class App(object):
     def __init__(self, cfg, game):
         self.game = game
         self.running = False
-
-        pygame.init()
-        pygame.display.set_mode(cfg['SCR_SIZE'], cfg['SCR_FLAGS'])
-        pygame.display.set_caption(cfg['SCR_CAP'])
+        self.log_writer = None
+
+        # Headless mode skips the display and mixer entirely, runs uncapped
+        # and optionally never draws. Used for batch simulation.
+        self.headless = cfg.get('HEADLESS', False)
+        self.draw_enabled = cfg.get('DRAW', True)
+        self.max_frames = cfg.get('MAX_FRAMES')
+        self.sim_frames = 0
+        self.sim_fps = 0
+        self.game.headless = self.headless
+
+        # Assets start loading in the background while the window opens.
+        self.assets = AssetManager()
+        self.game.assets = self.assets
+
+        if self.headless:
+            # Fonts are still needed to render the HUD off-screen.
+            pygame.font.init()
+            self.game.preload()
+            scr_surf = pygame.Surface(cfg['SCR_SIZE'])
+        else:
+            pygame.init()
+            self.game.preload()
+            pygame.display.set_mode(cfg['SCR_SIZE'], cfg['SCR_FLAGS'])
+            pygame.display.set_caption(cfg['SCR_CAP'])
+            scr_surf = pygame.display.get_surface()
 
         self.evt_mgr = self.init_event_mgr()
         self.register_events()
@@ -24,27 +51,167 @@ class App(object):
 
         self.clock = pygame.time.Clock()
 
-        self.game.scr_surf = pygame.display.get_surface()
+        # Fixed timestep settings. When FIXED_DT (ms) is set the game is
+        # updated in constant steps and drawn with an interpolation factor.
+        self.fixed_dt = cfg.get('FIXED_DT')
+        self.max_steps = cfg.get('MAX_STEPS', 5)
+        self.accumulator = 0
+
+        # Only redraw and push the parts of the screen that changed.
+        self.dirty_rects = cfg.get('DIRTY_RECTS', False)
+
+        # Optional per-frame profiling. Costs a single check per frame when
+        # turned off.
+        self.profiler = None
+        self.profile_file = cfg.get('PROFILE_FILE')
+        if cfg.get('PROFILE', False):
+            self.profiler = FrameProfiler()
+            self.evt_mgr.profiler = self.profiler
+            if cfg.get('PROFILE_OVERLAY', False):
+                self.game.profiler = self.profiler
+
+        # Everything drawn in a frame goes to the screen in one blits call.
+        self.render_queue = RenderQueue(scr_surf)
+        self.game.render_queue = self.render_queue
+
+        self.game.scr_surf = scr_surf
         self.game.build()
 
+        # Everything is subscribed now, drop the rest before it's queued.
+        if not self.headless:
+            self.evt_mgr.block_unused()
+
     def run(self):
         """Kicks off the game loop."""
+        if self.headless:
+            sim_fps = self.run_headless(self.max_frames)
+            pygame.quit()
+            return sim_fps
+
         self.running = True
 
         while self.running:
             self.clock.tick(60)  # Limit to 60FPS
 
-            self.evt_mgr.dispatch(pygame.event.get())
+            if self.profiler:
+                self.frame_profiled()
+            else:
+                self.frame()
 
-            self.game.update(self.clock.get_time())
+        if self.profiler and self.profile_file:
+            self.profiler.dump(self.profile_file)
 
-            self.game.scr_surf.fill((0, 0, 0))
-            self.game.draw()
-            pygame.display.update()
+        if self.log_writer:
+            self.log_writer.flush()
 
         pygame.quit()
         sys.exit()
 
+    def frame(self):
+        """Run a single frame of the game loop."""
+        self.evt_mgr.dispatch(pygame.event.get())
+        alpha = self.update(self.clock.get_time())
+        self.display(self.draw(alpha))
+
+    def frame_profiled(self):
+        """Same as frame, but timing each part of it."""
+        t0 = time.perf_counter()
+        self.evt_mgr.dispatch(pygame.event.get())
+        t1 = time.perf_counter()
+        alpha = self.update(self.clock.get_time())
+        t2 = time.perf_counter()
+        rects = self.draw(alpha)
+        t3 = time.perf_counter()
+        self.display(rects)
+        t4 = time.perf_counter()
+
+        self.profiler.add_frame((t1 - t0) * 1000, (t2 - t1) * 1000,
+                                (t3 - t2) * 1000, (t4 - t3) * 1000)
+
+    def update(self, frame_time):
+        """Update the game. Returns the interpolation alpha, if any."""
+        if self.fixed_dt:
+            return self.update_fixed(frame_time)
+
+        self.game.update(frame_time)
+        return None
+
+    def draw(self, alpha=None):
+        """Draw a frame. Returns the rects that changed, or None for all."""
+        if self.dirty_rects:
+            return self.game.draw_dirty(alpha)
+
+        self.game.scr_surf.fill((0, 0, 0))
+        if alpha is None:
+            self.game.draw()
+        else:
+            self.game.draw(alpha)
+        return None
+
+    def display(self, rects):
+        """Push the changed rects, or the whole frame, to the display."""
+        if rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
+
+    def run_headless(self, max_frames=None):
+        """Simulate as fast as possible without a display or frame cap.
+
+        Every frame advances the game by one fixed step, so results don't
+        depend on how fast the machine is. Runs until shutdown or max_frames
+        and returns the throughput in simulated frames per second. The number
+        of frames run is kept in sim_frames.
+
+        """
+        dt = self.fixed_dt or 1000 / 60
+        self.running = True
+
+        frames = 0
+        start = time.perf_counter()
+        while self.running and (max_frames is None or frames < max_frames):
+            self.game.update(dt)
+            if self.draw_enabled:
+                self.game.draw()
+            frames += 1
+
+        elapsed = time.perf_counter() - start
+        self.sim_frames = frames
+        self.sim_fps = frames / elapsed if elapsed > 0 else 0
+
+        if self.profiler and self.profile_file:
+            self.profiler.dump(self.profile_file)
+
+        if self.game.logging_enabled:
+            import logging
+            logging.info('Simulated %d frames at %.0f FPS', frames,
+                         self.sim_fps)
+
+        if self.log_writer:
+            self.log_writer.flush()
+
+        return self.sim_fps
+
+    def update_fixed(self, frame_time):
+        """Advance the game in fixed steps. Returns the interpolation alpha.
+
+        At most max_steps updates are run per frame. Any time left over after
+        that is dropped so a slow frame can't snowball into slower ones.
+
+        """
+        self.accumulator += frame_time
+
+        steps = 0
+        while self.accumulator >= self.fixed_dt and steps < self.max_steps:
+            self.game.update(self.fixed_dt)
+            self.accumulator -= self.fixed_dt
+            steps += 1
+
+        if self.accumulator >= self.fixed_dt:
+            self.accumulator %= self.fixed_dt
+
+        return self.accumulator / self.fixed_dt
+
     def on_keydown(self, evt):
         """Handle basic keydown events."""
         if evt.key == pygame.K_ESCAPE:
@@ -57,11 +224,18 @@ class App(object):
         return evt_mgr
 
     def init_logger(self, cfg):
-        """Configure the logging module."""
+        """Configure the logging module.
+
+        Records are only queued by the game thread. A background thread,
+        shared by every App in the process, formats them and writes them to
+        the log file.
+
+        """
         import logging
-        logging.basicConfig(filename=cfg['LOG_FILE'],
-                            level=cfg['LOG_LEVEL'],
-                            format='%(levelname)s:\t%(message)s')
+
+        self.log_writer = start_writer(cfg['LOG_FILE'],
+                                       '%(levelname)s:\t%(message)s')
+        logging.getLogger().setLevel(cfg['LOG_LEVEL'])
 
     def register_events(self):
         """Register a few base event handlers."""
@@ -74,4 +248,4 @@ class App(object):
 
         if self.game.logging_enabled:
             import logging
-            logging.info('{}\n'.format('-' * 75))
+            logging.info('%s\n', '-' * 75)
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+
+def load_sound(filename):
+    """Load a sound file. Needs the mixer to be initialized."""
+    return pygame.mixer.Sound(file=filename)
+
+
+class AssetManager(object):
+    """Loads images and sounds once and shares them between users.
+
+    Files can be preloaded on a background thread. Images are converted to
+    the display's pixel format the first time they are asked for, and scaled
+    copies are cached by size.
+
+    """
+
+    def __init__(self, workers=2):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.loads = {}   # {filename: Future}
+        self.images = {}  # {(filename, size, alpha): Surface}
+
+    def preload(self, images=(), sounds=()):
+        """Start loading the given files in the background."""
+        for filename in images:
+            self.load(filename, pygame.image.load)
+        for filename in sounds:
+            self.load(filename, load_sound)
+
+    def load(self, filename, loader):
+        """Return the future for a file, loading it if it isn't already."""
+        if filename not in self.loads:
+            self.loads[filename] = self.pool.submit(loader, filename)
+        return self.loads[filename]
+
+    def image(self, filename, size=None, alpha=False):
+        """Return an image converted for the display, optionally scaled.
+
+        Waits for the file if it is still being preloaded, and raises the
+        same errors pygame.image.load would.
+
+        """
+        key = (filename, size, alpha)
+        surf = self.images.get(key)
+
+        if surf is None:
+            if size is None:
+                surf = self.load(filename, pygame.image.load).result()
+                surf = self.convert(surf, alpha)
+            else:
+                surf = pygame.transform.scale(
+                    self.image(filename, alpha=alpha), size)
+            self.images[key] = surf
+
+        return surf
+
+    def sound(self, filename):
+        """Return a sound, waiting for it if it is still being preloaded."""
+        return self.load(filename, load_sound).result()
+
+    def convert(self, surf, alpha):
+        """Convert a surface to the display format, if there is a display."""
+        if pygame.display.get_surface() is None:
+            return surf
+
+        return surf.convert_alpha() if alpha else surf.convert()
@@ -0,0 +1,104 @@
+import pygame
+
+
+class Camera(object):
+    """A view onto a world that can be bigger than the screen.
+
+    rect is the part of the world on screen, in world coordinates. It never
+    leaves the world, so a world the size of the screen never scrolls.
+
+    """
+
+    def __init__(self, view_size, world_size):
+        self.rect = pygame.Rect((0, 0), view_size)
+        self.world = pygame.Rect((0, 0), world_size)
+        self.moved = False
+
+    def follow(self, x, y=None):
+        """Center the view on a point. Sets moved if the view changed."""
+        old = self.rect.topleft
+
+        self.rect.centerx = int(x)
+        if y is not None:
+            self.rect.centery = int(y)
+        self.rect.clamp_ip(self.world)
+
+        self.moved = self.rect.topleft != old
+
+    def to_screen(self, pos):
+        """Return a world position in screen coordinates."""
+        return pos[0] - self.rect.x, pos[1] - self.rect.y
+
+    def visible(self, rect):
+        """Return whether any of a world rect is on screen."""
+        return self.rect.colliderect(rect)
+
+
+class TiledBackground(object):
+    """A background split into tiles so only the visible ones are drawn.
+
+    Each tile is its own converted surface, so drawing costs the same no
+    matter how big the whole background is. The image is repeated to fill
+    the background, which is never held as one surface.
+
+    """
+
+    def __init__(self, surf, size=None, tile_size=256):
+        self.tile_size = tile_size
+        self.rect = pygame.Rect((0, 0), size or surf.get_size())
+        self.cols = -(-self.rect.width // tile_size)
+        self.rows = -(-self.rect.height // tile_size)
+
+        convert = pygame.display.get_surface() is not None
+        self.tiles = list()  # [[Surface, ...], ...] by row then column
+        for row in range(self.rows):
+            tiles = list()
+            for col in range(self.cols):
+                area = pygame.Rect(col * tile_size, row * tile_size,
+                                   tile_size, tile_size).clip(self.rect)
+                tile = pygame.Surface(area.size)
+                self.blit_repeated(tile, surf, area.topleft)
+                tiles.append(tile.convert() if convert else tile)
+            self.tiles.append(tiles)
+
+    @staticmethod
+    def blit_repeated(tile, surf, offset):
+        """Fill a tile at a world offset with copies of an image."""
+        w, h = surf.get_size()
+        x_start = -(offset[0] % w)
+        for y in range(-(offset[1] % h), tile.get_height(), h):
+            for x in range(x_start, tile.get_width(), w):
+                tile.blit(surf, (x, y))
+
+    def stamp(self, surf, rect):
+        """Draw an image into the background at a world rect."""
+        for tile, x, y in self.tiles_in(rect):
+            tile.blit(surf, (rect.x - x, rect.y - y))
+
+    def tiles_in(self, rect):
+        """Yield (tile, x, y) for every tile touching a world rect."""
+        size = self.tile_size
+        first_col = max(0, rect.left // size)
+        last_col = min(self.cols, (rect.right - 1) // size + 1)
+
+        for row in range(max(0, rect.top // size),
+                         min(self.rows, (rect.bottom - 1) // size + 1)):
+            tiles = self.tiles[row]
+            for col in range(first_col, last_col):
+                yield tiles[col], col * size, row * size
+
+    def draw(self, queue, camera, layer=0):
+        """Queue the tiles the camera can see."""
+        cam_x, cam_y = camera.rect.topleft
+        for tile, x, y in self.tiles_in(camera.rect):
+            queue.add(tile, (x - cam_x, y - cam_y), layer=layer)
+
+    def restore(self, queue, camera, rect, layer=0):
+        """Queue the part of the background under a screen rect."""
+        cam_x, cam_y = camera.rect.topleft
+        world = rect.move(cam_x, cam_y)
+
+        for tile, x, y in self.tiles_in(world):
+            area = world.clip(x, y, *tile.get_size())
+            queue.add(tile, (area.x - cam_x, area.y - cam_y),
+                      area.move(-x, -y), layer)
@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class EntityStore(object):
+    """Keeps entity positions and velocities in contiguous numpy arrays.
+
+    Each entity is a row index into the arrays, so moving, normalizing or
+    clamping every entity is a single vectorized operation. The previous
+    positions are kept for interpolated drawing.
+
+    """
+
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.prev = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+
+    def add(self, pos=(0, 0), vel=(0, 0)):
+        """Add an entity and return its index."""
+        if self.count == len(self.pos):
+            self.grow()
+
+        i = self.count
+        self.pos[i] = pos
+        self.prev[i] = pos
+        self.vel[i] = vel
+        self.count += 1
+        return i
+
+    def grow(self):
+        """Double the capacity of the arrays."""
+        size = len(self.pos) * 2
+        for name in ('pos', 'prev', 'vel'):
+            old = getattr(self, name)
+            new = np.zeros((size, 2))
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def integrate(self, dt):
+        """Move every entity by its velocity."""
+        n = self.count
+        self.prev[:n] = self.pos[:n]
+        self.pos[:n] += self.vel[:n] * dt
+
+    def normalize(self):
+        """Scale every non-zero velocity to unit length."""
+        vel = self.vel[:self.count]
+        length = np.hypot(vel[:, 0], vel[:, 1])
+        moving = length > 0
+        vel[moving] /= length[moving, np.newaxis]
+
+    def clamp(self, lower, upper):
+        """Keep every position within bounds. Returns which ones moved."""
+        pos = self.pos[:self.count]
+        clamped = np.clip(pos, lower, upper)
+        moved = (clamped != pos).any(axis=1)
+        pos[:] = clamped
+        return moved
+
+    def lerp(self, i, alpha):
+        """Return an entity's position blended between the last two."""
+        prev = self.prev[i]
+        x, y = prev + (self.pos[i] - prev) * alpha
+        return float(x), float(y)
+
+    def snap(self, i):
+        """Forget an entity's previous position."""
+        self.prev[i] = self.pos[i]
+
+
+class VecView(object):
+    """A 2D vector reading and writing one row of an EntityStore array.
+
+    Behaves enough like a Vector2 (x, y, indexing, iteration) for existing
+    code, and pygame accepts it anywhere a sequence of two numbers is.
+
+    """
+
+    __slots__ = ('store', 'name', 'index')
+
+    def __init__(self, store, name, index):
+        self.store = store
+        self.name = name
+        self.index = index
+
+    @property
+    def x(self):
+        return float(getattr(self.store, self.name)[self.index, 0])
+
+    @x.setter
+    def x(self, value):
+        getattr(self.store, self.name)[self.index, 0] = value
+
+    @property
+    def y(self):
+        return float(getattr(self.store, self.name)[self.index, 1])
+
+    @y.setter
+    def y(self, value):
+        getattr(self.store, self.name)[self.index, 1] = value
+
+    def __len__(self):
+        return 2
+
+    def __getitem__(self, i):
+        return float(getattr(self.store, self.name)[self.index, i])
+
+    def __setitem__(self, i, value):
+        getattr(self.store, self.name)[self.index, i] = value
+
+    def __iter__(self):
+        row = getattr(self.store, self.name)[self.index]
+        return iter((float(row[0]), float(row[1])))
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return '<VecView({}, {})>'.format(self.x, self.y)
@@ -1,39 +1,243 @@
 import logging
+import time
+from itertools import count
+import pygame
+
+# Motion events that only matter for their latest value. Maps the event type
+# to a function returning the device (and axis) the event belongs to. Mouse
+# motion is coalesced too, but by coalesce() itself since its rel adds up.
+COALESCE_KEYS = {
+    pygame.JOYAXISMOTION: lambda evt: (evt.type, evt.joy, evt.axis),
+    pygame.JOYHATMOTION: lambda evt: (evt.type, evt.joy, evt.hat)
+}
+
+# Returned by a handler to stop the event being passed on to the rest.
+CONSUMED = object()
 
 
 class EventManager(object):
-    """Allows functions to subscribe to specific pygame events."""
+    """Allows functions to subscribe to specific pygame events.
+
+    Every subscription gets a token which can be used to remove it again.
+    A reverse index from each function to its tokens makes unsubscribing a
+    function cheap, and nothing is left behind once it's gone.
+
+    Handlers with a higher priority are called first, and a handler can
+    consume an event by returning CONSUMED, which stops it being passed on.
+
+    """
 
     def __init__(self):
-        self.subs = {}
+        self.subs = {}         # {evt_type: {token: func}}
+        self.handlers = {}     # {evt_type: (func, ...)} used by dispatch
+        self.dirty = set()     # {evt_type, ...} whose handlers are stale
+        self.tokens = {}       # {token: (evt_type, func, priority)}
+        self.func_tokens = {}  # {func: {token, ...}}
+        self.next_token = count()
+
+        self.coalesce_motion = True
+        self.blocking = False
+        self.profiler = None
+        self.recorder = None
         self.logging_enabled = False
 
     def dispatch(self, evts):
-        """Dispatch the list of events to the subscribers."""
+        """Dispatch the list of events to the subscribers.
+
+        Redundant motion events are dropped first. Each event's handlers are
+        called from a snapshot, so they may subscribe or unsubscribe freely.
+        Changes apply from the next event.
+
+        """
+        if self.coalesce_motion:
+            evts = self.coalesce(evts)
+
+        if self.dirty:
+            self.update_handlers()
+
+        if self.recorder is not None:
+            self.recorder.record_events(evts)
+
+        if self.profiler is not None:
+            return self.dispatch_profiled(evts)
+
+        handlers = self.handlers
+        dirty = self.dirty
         for evt in evts:
-            if evt.type in self.subs:
-                for sub in self.subs[evt.type]:
-                    sub(evt)
+            if dirty:
+                self.update_handlers()
+
+            for sub in handlers.get(evt.type, ()):
+                if sub(evt) is CONSUMED:
+                    break
+
+    def dispatch_profiled(self, evts):
+        """Same as dispatch, but times every handler call."""
+        handlers = self.handlers
+        for evt in evts:
+            if self.dirty:
+                self.update_handlers()
+
+            for sub in handlers.get(evt.type, ()):
+                start = time.perf_counter()
+                consumed = sub(evt)
+                self.profiler.add(handler_name(sub),
+                                  (time.perf_counter() - start) * 1000)
+                if consumed is CONSUMED:
+                    break
+
+    def coalesce(self, evts):
+        """Drop all but the latest motion event per device and axis.
+
+        The mouse motion kept carries the total rel of the ones dropped, and
+        every button held during them, so no relative movement is lost.
+
+        """
+        latest = set()
+        mice = {}  # {touch: [index in kept, rel x, rel y, buttons]}
+        kept = list()
+        for evt in reversed(evts):
+            evt_type = evt.type
+            if evt_type == pygame.MOUSEMOTION:
+                # Hot path: read the attributes straight from the dict, and
+                # only keep running totals of the events dropped.
+                attrs = evt.dict
+                touch = attrs.get('touch', False)
+                total = mice.get(touch)
+                if total is None:
+                    mice[touch] = [len(kept), 0, 0, attrs.get('buttons')]
+                    kept.append(evt)
+                else:
+                    rel = attrs.get('rel', (0, 0))
+                    total[1] += rel[0]
+                    total[2] += rel[1]
+                    buttons = attrs.get('buttons')
+                    if buttons != total[3]:
+                        total[3] = or_buttons(total[3], buttons)
+                continue
+
+            key_func = COALESCE_KEYS.get(evt_type)
+            if key_func is not None:
+                key = key_func(evt)
+                if key in latest:
+                    continue
+                latest.add(key)
+            kept.append(evt)
+
+        # Give each mouse's kept event the motion of the ones dropped.
+        # The buttons started from the kept event's, so they already
+        # include them.
+        for i, rel_x, rel_y, buttons in mice.values():
+            attrs = dict(kept[i].dict)
+            if not rel_x and not rel_y and buttons == attrs.get('buttons'):
+                continue
+
+            rel = attrs.get('rel', (0, 0))
+            attrs['rel'] = (rel[0] + rel_x, rel[1] + rel_y)
+            if buttons is not None:
+                attrs['buttons'] = buttons
+            kept[i] = pygame.event.Event(pygame.MOUSEMOTION, attrs)
+
+        kept.reverse()
+        return kept
+
+    def subscribe(self, evt_type, func, priority=0):
+        """Subscribe a function to a given event type. Returns a token.
+
+        The function is called with each event. Returning CONSUMED stops the
+        event reaching handlers of a lower priority, anything else is
+        ignored.
+
+        """
+        token = next(self.next_token)
 
-    def subscribe(self, evt_type, func):
-        """Subscribe a function to a given event type."""
         if evt_type not in self.subs:
-            self.subs[evt_type] = list()
-        self.subs[evt_type].append(func)
+            self.subs[evt_type] = {}
+            if self.blocking:
+                pygame.event.set_allowed(evt_type)
+
+        self.subs[evt_type][token] = func
+        self.tokens[token] = (evt_type, func, priority)
+        self.func_tokens.setdefault(func, set()).add(token)
+        self.dirty.add(evt_type)
 
         if self.logging_enabled:
-            logging.debug('EVT_MGR: binding func {} to {}'.format(func,
-                                                                  evt_type))
+            logging.debug('EVT_MGR: binding func %s to %s', func, evt_type)
+
+        return token
 
     def subscribe_list(self, pairs):
-        """Subscribe a list of function to event tuples."""
-        for evt_type, func in pairs:
-            self.subscribe(evt_type, func)
+        """Subscribe a list of function to event tuples. Returns the tokens."""
+        return [self.subscribe(evt_type, func) for evt_type, func in pairs]
 
     def unsubscribe(self, func):
         """Attempt to unsubscribe a function. No errors if not found."""
-        for subList in self.subs:
-            if func in subList:
-                subList.remove(func)
-                if self.logging_enabled:
-                    logging.debug('EVT_MGR: unbinding func {}'.format(func))
+        for token in list(self.func_tokens.get(func, ())):
+            self.unsubscribe_token(token)
+
+    def unsubscribe_token(self, token):
+        """Remove a single subscription. No errors if not found."""
+        try:
+            evt_type, func, priority = self.tokens.pop(token)
+        except KeyError:
+            return
+
+        subs = self.subs[evt_type]
+        del subs[token]
+        if not subs:
+            del self.subs[evt_type]
+            if self.blocking:
+                pygame.event.set_blocked(evt_type)
+
+        tokens = self.func_tokens[func]
+        tokens.discard(token)
+        if not tokens:
+            del self.func_tokens[func]
+
+        self.dirty.add(evt_type)
+
+        if self.logging_enabled:
+            logging.debug('EVT_MGR: unbinding func %s from %s', func,
+                          evt_type)
+
+    def block_unused(self):
+        """Stop pygame queueing event types nobody is subscribed to.
+
+        Needs the display to be initialized. Subscribing to a new event type
+        allows it again.
+
+        """
+        self.blocking = True
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(list(self.subs))
+
+    def update_handlers(self):
+        """Rebuild the handler snapshots of every changed event type.
+
+        Subscribing and unsubscribing only mark the type as changed, so a
+        burst of changes costs a single rebuild on the next dispatch.
+
+        """
+        for evt_type in self.dirty:
+            subs = self.subs.get(evt_type)
+            if subs:
+                # sorted() is stable, so equal priorities keep subscription
+                # order.
+                tokens = sorted(subs, key=lambda t: -self.tokens[t][2])
+                self.handlers[evt_type] = tuple(subs[t] for t in tokens)
+            else:
+                self.handlers.pop(evt_type, None)
+        self.dirty.clear()
+
+
+def handler_name(func):
+    """Return a readable name for a handler."""
+    return 'handler ' + getattr(func, '__qualname__', repr(func))
+
+
+
+def or_buttons(buttons, other):
+    """Return the buttons held in either of two button states."""
+    if buttons is None or other is None:
+        return other if buttons is None else buttons
+    return tuple(a | b for a, b in zip(buttons, other))
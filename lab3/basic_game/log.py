@@ -0,0 +1,107 @@
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+_writer = None  # The process's AsyncLogWriter, see start_writer().
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues log records with only their message formatted.
+
+    The message is merged with its arguments straight away, so it shows them
+    as they were when logged. The rest of the formatting is left to the
+    writer.
+
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class AsyncLogWriter(threading.Thread):
+    """Formats queued log records and writes them to a file in batches.
+
+    The game thread only pays for putting a record on the queue. Everything
+    waiting on the queue is written and flushed in one go.
+
+    """
+
+    def __init__(self, filename, fmt, batch_size=256):
+        super(AsyncLogWriter, self).__init__(name='AsyncLogWriter',
+                                             daemon=True)
+        self.queue = queue.SimpleQueue()
+        self.handler = DeferredQueueHandler(self.queue)
+        self.filename = filename
+        self.formatter = logging.Formatter(fmt)
+        self.batch_size = batch_size
+
+    def run(self):
+        """Write batches until the stop sentinel (None) is received."""
+        with open(self.filename, 'a') as f:
+            stopping = False
+            while not stopping:
+                batch = [self.queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                lines = list()
+                flushed = list()
+                for record in batch:
+                    if record is None:
+                        stopping = True
+                    elif isinstance(record, threading.Event):
+                        flushed.append(record)
+                    else:
+                        lines.append(self.formatter.format(record) + '\n')
+
+                f.writelines(lines)
+                f.flush()
+                for done in flushed:
+                    done.set()
+
+    def flush(self):
+        """Wait until everything queued so far has been written."""
+        if self.is_alive():
+            done = threading.Event()
+            self.queue.put(done)
+            done.wait()
+
+    def stop(self):
+        """Write out anything still queued and wait for the thread to end.
+
+        The handler is taken off the root logger first, so nothing is left
+        queueing records that will never be written.
+
+        """
+        logging.getLogger().removeHandler(self.handler)
+        if self.is_alive():
+            self.queue.put(None)
+            self.join()
+
+
+def start_writer(filename, fmt):
+    """Send the root logger's records to a background writer. Returns it.
+
+    There is only one writer per process, and it runs until exit, so every
+    record logged has a thread to write it. Asking for the same file again
+    returns the running writer, another file replaces it.
+
+    """
+    global _writer
+    if _writer is not None:
+        if _writer.filename == filename and _writer.is_alive():
+            return _writer
+        _writer.stop()
+
+    _writer = AsyncLogWriter(filename, fmt)
+    _writer.start()
+    logging.getLogger().addHandler(_writer.handler)
+    atexit.register(_writer.stop)
+    return _writer
@@ -0,0 +1,67 @@
+from collections import deque
+
+
+class FrameProfiler(object):
+    """Keeps a rolling window of timings (in ms) for named sections."""
+
+    # Sections timed by the App every frame, in the order they run.
+    FRAME_SECTIONS = ('dispatch', 'update', 'draw', 'display', 'frame')
+
+    def __init__(self, window=300, refresh=30):
+        self.window = window
+        self.samples = {}  # {name: deque}
+
+        # The overlay text is only rebuilt every few frames.
+        self.refresh = refresh
+        self.frames = 0
+        self.lines = list()
+
+    def add(self, name, ms):
+        """Record a single timing for a section."""
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(ms)
+
+    def add_frame(self, dispatch, update, draw, display):
+        """Record the timings of one frame of the game loop."""
+        self.add('dispatch', dispatch)
+        self.add('update', update)
+        self.add('draw', draw)
+        self.add('display', display)
+        self.add('frame', dispatch + update + draw + display)
+        self.frames += 1
+
+    def percentiles(self, name, pcts=(50, 95, 99)):
+        """Return the given percentiles of a section's recent timings."""
+        samples = sorted(self.samples.get(name, ()))
+        if not samples:
+            return [0.0] * len(pcts)
+
+        last = len(samples) - 1
+        return [samples[int(round(last * pct / 100.0))] for pct in pcts]
+
+    def format_line(self, name):
+        """Format a section as 'name  p50  p95  p99' in ms."""
+        p50, p95, p99 = self.percentiles(name)
+        return '{:<32} {:7.2f} {:7.2f} {:7.2f}'.format(name, p50, p95, p99)
+
+    def overlay_lines(self):
+        """Return the frame section summary, rebuilt every few frames."""
+        if not self.lines or self.frames % self.refresh == 0:
+            self.lines = ['{:<32} {:>7} {:>7} {:>7}'.format('ms', 'p50',
+                                                            'p95', 'p99')]
+            self.lines.extend(self.format_line(name)
+                              for name in self.FRAME_SECTIONS)
+        return self.lines
+
+    def dump(self, filename):
+        """Write the summary of every section to a file."""
+        with open(filename, 'w') as f:
+            f.write('{:<32} {:>7} {:>7} {:>7}\n'.format('ms', 'p50', 'p95',
+                                                        'p99'))
+            for name in self.FRAME_SECTIONS:
+                f.write(self.format_line(name) + '\n')
+            for name in sorted(self.samples):
+                if name not in self.FRAME_SECTIONS:
+                    f.write(self.format_line(name) + '\n')
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+import os
+import sys
+
+# Benchmarks never open a real window or audio device.
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+from basic_game.app import App
+from basic_game.benchmark import Suite, main
+from basic_game.entities import EntityStore
+from basic_game.event import EventManager
+from basic_game.render import RenderQueue
+from sprites import Car
+from hud import HUD
+from main import Game
+
+ENTITY_COUNTS = (10, 100, 1000, 10000)
+SCR_SIZES = ((640, 480), (1024, 480), (1920, 1080))
+FLOOD_SIZE = 10000
+
+suite = Suite()
+
+
+def bench_dispatch(evt_types):
+    """Return a benchmark dispatching a flood of events of the given types."""
+    def setup():
+        evt_mgr = EventManager()
+        for evt_type in (pygame.KEYDOWN, pygame.MOUSEMOTION,
+                         pygame.MOUSEBUTTONDOWN):
+            for _ in range(4):
+                evt_mgr.subscribe(evt_type, lambda evt: None)
+
+        evts = [pygame.event.Event(evt_types[i % len(evt_types)],
+                                   key=pygame.K_a, pos=(i, i), rel=(1, 1),
+                                   button=1, buttons=(0, 0, 0))
+                for i in range(FLOOD_SIZE)]
+        return lambda: evt_mgr.dispatch(evts)
+    return setup
+
+
+suite.add('dispatch_keydown', bench_dispatch([pygame.KEYDOWN]))
+suite.add('dispatch_mixed', bench_dispatch([pygame.KEYDOWN,
+                                            pygame.MOUSEMOTION,
+                                            pygame.MOUSEBUTTONDOWN,
+                                            pygame.USEREVENT]))
+suite.add('dispatch_motion', bench_dispatch([pygame.MOUSEMOTION]))
+
+
+def make_hud():
+    """Return a HUD drawing to an off-screen surface, with two cars."""
+    target = pygame.Surface((1024, 480))
+    hud = HUD(target, 36, 200, flash_size=(1024, 72))
+    hud.register_cars([Car('red_car', pygame.Surface((64, 64))),
+                       Car('blue_car', pygame.Surface((64, 64)))])
+    return hud
+
+
+@suite.bench('hud_update_surf')
+def bench_hud_update():
+    return make_hud().update_hud_surf
+
+
+@suite.bench('hud_draw')
+def bench_hud_draw():
+    hud = make_hud()
+    hud.flash('Benchmarking', 10 ** 9)
+    queue = RenderQueue(hud.target)
+
+    def draw():
+        hud.draw(queue)
+        queue.flush()
+    return draw
+
+
+def bench_cars(n):
+    """Return a benchmark moving n cars that share a store."""
+    def setup():
+        store = EntityStore(n)
+        img = pygame.Surface((64, 64))
+        cars = [Car('car_{}'.format(i), img, store) for i in range(n)]
+        for car in cars:
+            car.vel.x = 0.5
+
+        def update():
+            store.integrate(1000 / 120)
+            for car in cars:
+                car.update(1000 / 120)
+        return update
+    return setup
+
+
+for n in ENTITY_COUNTS:
+    suite.add('car_update_{}'.format(n), bench_cars(n))
+
+
+def bench_frame(scr_size):
+    """Return a benchmark running full App frames at a screen size."""
+    def setup():
+        cfg = {
+            'SCR_SIZE': scr_size,
+            'SCR_CAP': '',
+            'SCR_FLAGS': 0,
+            'LOGGING': 'False',
+            'HEADLESS': True,
+            'FIXED_DT': 1000 / 120
+        }
+        app = App(cfg, Game())
+
+        def frame():
+            app.evt_mgr.dispatch([])
+            app.draw(app.update(app.fixed_dt))
+        return frame
+    return setup
+
+
+for size in SCR_SIZES:
+    suite.add('frame_{}x{}'.format(*size), bench_frame(size))
+
+
+if __name__ == '__main__':
+    pygame.font.init()
+    sys.exit(main(suite, 'Lab 3: Benchmarks'))
@@ -1,6 +1,32 @@
+from collections import OrderedDict
 import pygame
 
 
+class TextCache(object):
+    """Keeps the most recently rendered text surfaces around for reuse."""
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.surfs = OrderedDict()
+
+    def render(self, font, text, antialias, colour, bg_colour=None):
+        """Same as Font.render, but only renders strings it hasn't seen."""
+        key = (font, text, antialias, colour, bg_colour)
+        surf = self.surfs.get(key)
+
+        if surf is None:
+            surf = font.render(text, antialias, colour, bg_colour)
+            self.surfs[key] = surf
+
+            # Evict the least recently used surface.
+            if len(self.surfs) > self.max_size:
+                self.surfs.popitem(last=False)
+        else:
+            self.surfs.move_to_end(key)
+
+        return surf
+
+
 class HUD(object):
     """Draws score output to a single surface."""
 
@@ -15,6 +41,8 @@ class HUD(object):
         # Load the default font.
         self.font = pygame.font.Font(None, int(font_size))
         self.flash_font = pygame.font.Font(None, int(font_size) * 2)
+        self.overlay_font = pygame.font.Font(None, max(12, int(font_size) // 2))
+        self.text_cache = TextCache()
 
         # Create a surface twice the font height.
         self.hud_surf = pygame.Surface((width, (font_size * 2) + line_space))
@@ -32,8 +60,8 @@ class HUD(object):
         self.flash_start_time = pygame.time.get_ticks()
 
         # Render the new message to the surface.
-        self.flash_surf = \
-            self.flash_font.render(msg, False, (0, 0, 0), self.bg_colour)
+        self.flash_surf = self.text_cache.render(
+            self.flash_font, msg, False, (0, 0, 0), self.bg_colour)
         self.flash_surf.set_colorkey(self.bg_colour)
 
         # Recalculate position
@@ -52,11 +80,22 @@ class HUD(object):
         # Redraw the text
         for i, car in enumerate(self.cars):
             text = '{} {}'.format(car.name.split('_')[0], car.score)
-            text_surf = \
-                self.font.render(text, False, (0, 0, 0), self.bg_colour)
+            text_surf = self.text_cache.render(
+                self.font, text, False, (0, 0, 0), self.bg_colour)
             y = (i * self.font.get_height()) + self.line_space
             self.hud_surf.blit(text_surf, (0, y))
 
+    def draw_overlay(self, queue, lines, layer=0):
+        """Queue lines of debug text at the bottom left of the target."""
+        height = self.overlay_font.get_linesize()
+        y = self.target.get_height() - (height * len(lines))
+
+        for line in lines:
+            text_surf = self.text_cache.render(
+                self.overlay_font, line, False, (255, 255, 255), (0, 0, 0))
+            queue.add(text_surf, (0, y), layer=layer)
+            y += height
+
     def register_cars(self, cars):
         """Register cars and add score change event handler"""
         self.cars.extend(cars)
@@ -66,10 +105,10 @@ class HUD(object):
         # Redraw HUD.
         self.update_hud_surf()
 
-    def draw(self):
-        """Blit the HUD surface to target surface."""
-        self.target.blit(self.hud_surf, self.pos)
+    def draw(self, queue, layer=0):
+        """Queue the HUD surface, and the flash message while it shows."""
+        queue.add(self.hud_surf, self.pos, layer=layer)
 
         now = pygame.time.get_ticks()
         if (now - self.flash_start_time) < self.flash_duration:
-            self.target.blit(self.flash_surf, self.flash_pos)
+            queue.add(self.flash_surf, self.flash_pos, layer=layer)
@@ -1,10 +1,15 @@
 #!/usr/bin/env python
 import sys
 import random
+import logging
+import argparse
 import pygame
 from pygame.math import Vector2
 
 from basic_game.app import App
+from basic_game.atlas import Atlas
+from basic_game.camera import Camera, TiledBackground
+from basic_game.entities import EntityStore
 from sprites import Car, FinishLine
 from hud import HUD
 
@@ -12,63 +17,186 @@ from hud import HUD
 class Game(object):
     """Main game class. Contains all game logic."""
 
+    # Render queue layers, drawn lowest first.
+    BG_LAYER = 0
+    CAR_LAYER = 1
+    HUD_LAYER = 2
+
     def __init__(self):
         # The following objects are injected by the App class.
         self.evt_mgr = None
         self.scr_surf = None
+        self.render_queue = None
+        self.assets = None
         self.logging_enabled = False
+        self.headless = False
+        self.profiler = None  # Only injected when the overlay is on.
+        self.recorder = None  # Set while recording a replay.
 
         self.sounds = dict()
         self.sprites = pygame.sprite.Group()
+        self.atlas = Atlas()
+        self.entities = EntityStore()
         self.finish_line = None
         self.background = None
+        self.camera = None
         self.racing = False
 
+        # How many screens long the track is. The camera follows the lead
+        # car when it is longer than one.
+        self.track_scale = 1
+
+        # Dirty rect drawing state. Once the changed area passes
+        # max_dirty_area (as a fraction of the screen) the whole screen is
+        # redrawn instead.
+        self.drawn_rects = list()
+        self.full_redraw = True
+        self.max_dirty_area = 0.5
+        self.last_winners = list()
+
+        # Cars reaching the line within this fraction of a step tie.
+        self.tie_time = 1e-9
+
+        # Each game owns its RNG so races can be seeded and run in parallel.
+        self.rng = random.Random()
+
         self.hud = None
 
     def update(self, dt):
         """Update the game logic."""
         if self.racing:
             self.update_car_vel(dt)
+        elif self.auto_race:
+            self.start_race()
+
+        if self.recorder:
+            self.recorder.record_vels()
+
+        # Move every car at once. The cars keep float positions, and their
+        # rects are only synced when drawing or checking collisions.
+        self.entities.integrate(dt)
+
+        if self.racing:
             self.check_for_winner()
 
-        self.sprites.update(dt)
+        if self.recorder:
+            self.recorder.record_step()
+
+    def draw(self, alpha=None):
+        """Blit surfaces to the display surface.
+
+        When running with a fixed timestep, alpha is how far we are between
+        the last two updates and the cars are drawn blended between them.
+
+        """
+        self.update_camera(alpha)
+        self.background.draw(self.render_queue, self.camera, Game.BG_LAYER)
+        self.draw_cars(alpha)
+        self.draw_hud()
+        self.render_queue.flush()
 
-    def draw(self):
-        """Blit surfaces to the display surface."""
-        self.scr_surf.blit(self.background, (0, 0))
-        self.scr_surf.blit(self.finish_line.image, self.finish_line.rect)
-        self.sprites.draw(self.scr_surf)
-        self.hud.draw()
+    def draw_dirty(self, alpha=None):
+        """Draw only what changed since the last call.
+
+        The background is restored under everything drawn last time before
+        drawing again. Returns the rects that changed, or None when the
+        whole screen should be updated. Scrolling redraws the whole screen.
+
+        """
+        queue = self.render_queue
+        self.update_camera(alpha)
+
+        if self.full_redraw or self.camera.moved:
+            self.full_redraw = False
+            self.background.draw(queue, self.camera, Game.BG_LAYER)
+            restored = len(queue)
+            self.draw_cars(alpha)
+            self.draw_hud()
+            self.drawn_rects = queue.flush(doreturn=True)[restored:]
+            return None
+
+        for rect in self.drawn_rects:
+            self.background.restore(queue, self.camera, rect, Game.BG_LAYER)
+        restored = len(queue)
+
+        self.draw_cars(alpha)
+        self.draw_hud()
+
+        # The background layer is drawn first, so its rects come first.
+        drawn = queue.flush(doreturn=True)[restored:]
+        dirty = self.drawn_rects + drawn
+        self.drawn_rects = drawn
+
+        # Lots of small updates cost more than one big one.
+        scr_w, scr_h = self.scr_surf.get_size()
+        area = sum(r.width * r.height for r in dirty)
+        if area > scr_w * scr_h * self.max_dirty_area:
+            self.full_redraw = True
+            return None
+
+        return dirty
+
+    def draw_cars(self, alpha=None):
+        """Queue the cars the camera can see."""
+        if alpha is None:
+            self.sync_rects()
+
+        for car in self.sprites:
+            x, y = car.rect.topleft if alpha is None else car.lerp_pos(alpha)
+            w, h = car.rect.size
+            if self.camera.visible((x, y, w, h)):
+                self.render_queue.add(car.page, self.camera.to_screen((x, y)),
+                                      car.area, Game.CAR_LAYER)
+
+    def update_camera(self, alpha=None):
+        """Center the camera on the lead car."""
+        if alpha is None:
+            centers = (car.pos.x + car.rect.width / 2 for car in self.sprites)
+        else:
+            centers = (car.lerp_pos(alpha)[0] + car.rect.width / 2
+                       for car in self.sprites)
+
+        self.camera.follow(max(centers))
+
+    def draw_hud(self):
+        """Queue the HUD and profiler overlay."""
+        self.hud.draw(self.render_queue, Game.HUD_LAYER)
+        if self.profiler:
+            self.hud.draw_overlay(self.render_queue,
+                                  self.profiler.overlay_lines(),
+                                  Game.HUD_LAYER)
 
     def build(self):
         """Called before the game loop starts."""
+        self.auto_race = self.headless
+        self.setup_camera()
         self.setup_cars()
-        self.setup_finish_line()
+        self.setup_track()
         self.setup_event_handlers()
         self.setup_hud()
 
-        # Load the background and scale to screen size.
-        self.background = pygame.image.load('street.png')
-        self.background = pygame.transform.scale(self.background,
-                                                 self.scr_surf.get_size())
-
-        # Set the delay before a key starts repeating, and the repeat rate.
-        pygame.key.set_repeat(250, 25)
-
         self.hud.flash("Press G to start, R to reset", 2500)
 
-        try:
-            self.sounds['race_start'] = pygame.mixer.Sound(file='gunshot.ogg')
-            self.sounds['race_end'] = pygame.mixer.Sound(file='winner.ogg')
-        except pygame.error:
-            print('Error loading sounds: {}'.format(pygame.get_error()))
-            exit(1)
+        # There is no keyboard or mixer when running headless.
+        if not self.headless:
+            # Set the delay before a key starts repeating, and the repeat rate.
+            pygame.key.set_repeat(250, 25)
+
+            try:
+                self.sounds['race_start'] = self.assets.sound('gunshot.ogg')
+                self.sounds['race_end'] = self.assets.sound('winner.ogg')
+            except pygame.error:
+                print('Error loading sounds: {}'.format(pygame.get_error()))
+                exit(1)
 
         if self.logging_enabled:
-            import logging
             logging.info('Game done building.')
 
+    def preload(self):
+        """Called before the window is created. Starts loading assets."""
+        sounds = () if self.headless else ('gunshot.ogg', 'winner.ogg')
+        self.assets.preload(images=['street.png'], sounds=sounds)
+
     def on_keydown(self, evt):
         """Start or restart the race."""
         if evt.key == pygame.K_g:
@@ -76,26 +204,46 @@ class Game(object):
         elif evt.key == pygame.K_r:
             self.reset_cars()
 
+    def seed(self, seed):
+        """Seed the game's RNG so the next races can be reproduced."""
+        self.rng.seed(seed)
+
     def update_car_vel(self, dt):
         """Set both car's velocities to a random float from 0 to 1."""
         for car in self.sprites:
-            car.vel.x = 0.01 + random.random()
+            car.vel.x = 0.01 + self.rng.random()
 
     def check_for_winner(self):
-        """Check if either car has hit the finish line."""
-        collisions = pygame.sprite.spritecollide(self.finish_line, self.sprites,
-                                                 False)
+        """Check if any car crossed the finish line during the last step.
+
+        The time each car reached the line within the step is worked out
+        from its previous and current positions, so fast cars can't jump
+        over it, and cars finishing in the same step are ranked by time.
+
+        """
+        line_x = self.finish_line.rect.x
+        crossings = [(car.crossing_time(line_x), car) for car in self.sprites]
+        crossings = [(t, car) for t, car in crossings if t is not None]
+
+        collisions = list()
+        if crossings:
+            first = min(t for t, car in crossings)
+            collisions = [car for t, car in crossings
+                          if t - first <= self.tie_time]
+
         n = len(collisions)
         log_msg = ''
 
         if n >= 2:
             log_msg = 'Race was a tie.'
+            self.last_winners = [car.name for car in self.sprites]
             for car in self.sprites:
                 car.adj_score(1)
                 self.move_car_to_finish_area(car)
         elif n == 1:
             winner = collisions[0]
             log_msg = '{} won the race.'.format(winner)
+            self.last_winners = [winner.name]
             winner.adj_score(1)
             self.move_car_to_finish_area(winner)
 
@@ -112,12 +260,18 @@ class Game(object):
             if self.logging_enabled:
                 logging.info(log_msg)
 
+    def sync_rects(self):
+        """Move the car rects to their current positions."""
+        for car in self.sprites:
+            car.sync_rect()
+
     def start_race(self):
         """Start a new race."""
         if self.logging_enabled:
             logging.info('Starting a new race')
 
         self.reset_cars()
+        self.last_winners = list()
         self.racing = True
         self.play_sound('race_start')
 
@@ -128,27 +282,34 @@ class Game(object):
 
         for car in self.sprites:
             # Move to the left side.
-            car.rect.x = 0
+            car.pos.x = 0
             car.vel.x = 0
 
             # Set the red car on top, and blue car bellow.
             scr_y = self.scr_surf.get_size()[1]
-            half_car = car.image.get_size()[1] / 2
+            half_car = car.rect.height / 2
             if car.name == 'red_car':
-                car.rect.y = scr_y * 0.37 - half_car
+                car.pos.y = scr_y * 0.37 - half_car
             elif car.name == 'blue_car':
-                car.rect.y = scr_y * 0.62 - half_car
+                car.pos.y = scr_y * 0.62 - half_car
+
+            car.snap()
 
     def setup_cars(self):
         """Initialize the Car sprites."""
-        # Create cars using colored blocks for now.
-        size = (64, 64)
+        # Create cars using colored blocks for now. Both are tinted copies
+        # of a white block, packed into the atlas.
+        block = pygame.Surface((64, 64))
+        block.fill((255, 255, 255))
+        self.atlas.add_tinted('red_car', block, (255, 0, 0))
+        self.atlas.add_tinted('blue_car', block, (0, 0, 255))
+        self.atlas.convert()
 
-        red_car = Car('red_car', pygame.Surface(size))
-        red_car.image.fill((255, 0, 0))
+        page, area = self.atlas.region('red_car')
+        red_car = Car('red_car', page, self.entities, area)
 
-        blue_car = Car('blue_car', pygame.Surface(size))
-        blue_car.image.fill((0, 0, 255))
+        page, area = self.atlas.region('blue_car')
+        blue_car = Car('blue_car', page, self.entities, area)
 
         # Register the cars with the sprite group.
         self.sprites.add(red_car, blue_car)
@@ -158,15 +319,39 @@ class Game(object):
 
     def move_car_to_finish_area(self, car):
         """Moves a car into the area after the finish line."""
-        scr_x = self.scr_surf.get_size()[0]
+        scr_x = self.camera.world.width
         finish_line_left = self.finish_line.rect.x + self.finish_line.rect.width
         finish_area_mid_point = scr_x - ((scr_x - finish_line_left) / 2)
 
-        car.rect.x = finish_area_mid_point - (car.rect.width / 2)
+        car.pos.x = finish_area_mid_point - (car.rect.width / 2)
+        car.snap()
 
-    def setup_finish_line(self):
+    def setup_finish_line(self, street_surf):
         """Create the finish line surface."""
-        self.finish_line = FinishLine('finish', self.scr_surf, 0.03, 0.8)
+        # Size the line to one screen of street, then move it 80% of the
+        # way along the whole track.
+        self.finish_line = FinishLine('finish', street_surf, 0.03, 0.8)
+        self.finish_line.rect.x = self.camera.world.width * 0.8
+
+    def setup_camera(self):
+        """Create the camera for a track track_scale screens long."""
+        # The track can't be shorter than the screen.
+        self.track_scale = max(1, self.track_scale)
+
+        scr_x, scr_y = self.scr_surf.get_size()
+        self.camera = Camera((scr_x, scr_y),
+                             (int(scr_x * self.track_scale), scr_y))
+
+    def setup_track(self):
+        """Create the finish line and the tiled track background."""
+        # The street is scaled to one screen and repeated along the track.
+        street_surf = self.assets.image('street.png',
+                                        self.scr_surf.get_size())
+        self.setup_finish_line(street_surf)
+
+        # The finish line never moves, so draw it into the background once.
+        self.background = TiledBackground(street_surf, self.camera.world.size)
+        self.background.stamp(self.finish_line.image, self.finish_line.rect)
 
     def setup_hud(self):
         """Create the HUD object"""
@@ -191,15 +376,40 @@ class Game(object):
 
     def play_sound(self, name):
         "Plays a sound and catches any exceptions."
+        if self.headless:
+            return
+
         try:
             self.sounds[name].play()
-        except IndexError:
+        except KeyError:
             print('Error: sound {} not loaded.'.format(name))
         except pygame.error:
             print('Error: could not play sound {}.'.format(name))
 
+
+def get_args():
+    """Init the parser and return the arguments."""
+    parser = argparse.ArgumentParser(description='Lab 3: Car race')
+
+    parser.add_argument('--headless', action='store_true',
+                        help='simulate races without a window')
+    parser.add_argument('-f', '--frames', type=int, default=100000,
+                        help='number of frames to simulate when headless')
+    parser.add_argument('--no-draw', action='store_true',
+                        help="don't draw anything when headless")
+    parser.add_argument('--profile', action='store_true',
+                        help='show frame timings and save them on exit')
+    parser.add_argument('-r', '--record', help='record a replay to a file')
+    parser.add_argument('-s', '--seed', type=int,
+                        help='the seed to record with (default: random)')
+    parser.add_argument('-t', '--track', type=float, default=1,
+                        help='the track length in screens (default: 1)')
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
-    import logging
+    args = get_args()
+
     # Create the configuration dict.
     cfg = {
         'SCR_SIZE': (1024, 480),
@@ -207,9 +417,36 @@ if __name__ == '__main__':
         'SCR_FLAGS': pygame.HWSURFACE | pygame.DOUBLEBUF,
         'LOGGING': 'True',
         'LOG_LEVEL': logging.DEBUG,
-        'LOG_FILE': 'log.txt'
+        'LOG_FILE': 'log.txt',
+        'FIXED_DT': 1000 / 120,  # Update at 120Hz regardless of frame rate.
+        'MAX_STEPS': 8,
+        'DIRTY_RECTS': True,
+        'PROFILE': args.profile,
+        'PROFILE_OVERLAY': args.profile,
+        'PROFILE_FILE': 'profile.txt',
+        'HEADLESS': args.headless,
+        'MAX_FRAMES': args.frames,
+        'DRAW': not args.no_draw
     }
 
     # Initialize the app and run it.
-    app = App(cfg, Game())
-    app.run()
+    game = Game()
+    game.track_scale = args.track
+    app = App(cfg, game)
+
+    recorder = None
+    if args.record:
+        from replay import Recorder
+        seed = args.seed if args.seed is not None else random.getrandbits(32)
+        recorder = Recorder(args.record, game, seed, app.fixed_dt)
+
+    try:
+        sim_fps = app.run()
+    finally:
+        if recorder:
+            recorder.close()
+
+    # Only reached when headless.
+    print('Simulated {} frames at {:.0f} FPS'.format(app.sim_frames, sim_fps))
+    for car in game.sprites:
+        print('{}: {} wins'.format(car.name, car.score))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+import struct
+import argparse
+from collections import Counter
+from multiprocessing import Pool, cpu_count
+
+from basic_game.app import App
+from main import Game
+
+# Configuration for the headless App built in every worker process.
+CFG = {
+    'SCR_SIZE': (1024, 480),
+    'SCR_CAP': '',
+    'SCR_FLAGS': 0,
+    'LOGGING': 'False',
+    'HEADLESS': True,
+    'DRAW': False,
+    'FIXED_DT': 1000 / 120
+}
+
+# Result codes stored in place of a car index.
+TIE = -1
+NO_FINISH = -2
+
+# One record per race: seed, winning car index (or result code) and steps.
+RECORD = struct.Struct('<IbI')
+
+# Each worker builds its own App and Game once and reuses it for every race.
+_app = None
+
+
+def init_worker(cfg):
+    """Create the headless App used by this worker process."""
+    global _app
+    _app = App(cfg, Game())
+
+
+def car_names():
+    """Return the car names, in the order used for the result codes."""
+    return [car.name for car in _app.game.sprites]
+
+
+def run_race(job):
+    """Run a single seeded race. Returns a (seed, code, steps) tuple."""
+    seed, max_steps = job
+    game = _app.game
+    dt = _app.fixed_dt
+
+    game.seed(seed)
+    game.start_race()
+
+    steps = 0
+    while game.racing and steps < max_steps:
+        game.update(dt)
+        steps += 1
+
+    winners = game.last_winners
+    if not winners:
+        code = NO_FINISH
+    elif len(winners) > 1:
+        code = TIE
+    else:
+        code = car_names().index(winners[0])
+
+    return seed, code, steps
+
+
+def run_farm(races, seed=0, out_file=None, procs=None, max_steps=10000):
+    """Run races across a process pool and return (names, wins, ties).
+
+    Each race gets the seed 'seed + i', so a farm run is reproducible no
+    matter how the races are spread over the workers. Results are streamed
+    to out_file as they come in, if given.
+
+    """
+    procs = procs or cpu_count()
+    chunk_size = max(1, races // (procs * 16))
+    jobs = ((seed + i, max_steps) for i in range(races))
+
+    wins = Counter()
+    ties = Counter()
+
+    out = open(out_file, 'wb') if out_file else None
+    try:
+        with Pool(procs, initializer=init_worker, initargs=(CFG,)) as pool:
+            names = pool.apply(car_names)
+            if out:
+                out.write(write_header(names))
+
+            for seed_, code, steps in pool.imap_unordered(run_race, jobs,
+                                                          chunk_size):
+                if code == TIE:
+                    ties.update(names)
+                elif code >= 0:
+                    wins[names[code]] += 1
+
+                if out:
+                    out.write(RECORD.pack(seed_, code, steps))
+    finally:
+        if out:
+            out.close()
+
+    return names, wins, ties
+
+
+def write_header(names):
+    """Return the results file header: the car names on one line."""
+    return (','.join(names) + '\n').encode()
+
+
+def read_results(filename):
+    """Read a results file. Returns the car names and a list of records."""
+    with open(filename, 'rb') as f:
+        names = f.readline().decode().rstrip('\n').split(',')
+        data = f.read()
+
+    return names, list(RECORD.iter_unpack(data))
+
+
+def get_args():
+    """Init the parser and return the arguments."""
+    parser = argparse.ArgumentParser(description='Lab 3: Race farm')
+
+    parser.add_argument('races', type=int, help='the number of races to run')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='the seed of the first race')
+    parser.add_argument('-o', '--out', help='file to stream the results to')
+    parser.add_argument('-p', '--procs', type=int,
+                        help='number of worker processes (default: all cores)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = get_args()
+    names, wins, ties = run_farm(args.races, args.seed, args.out, args.procs)
+
+    print('{} races'.format(args.races))
+    for name in names:
+        print('{}: {} wins, {} ties'.format(name, wins[name], ties[name]))
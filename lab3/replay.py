@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+import time
+import struct
+import argparse
+import pygame
+
+# A replay file starts with a header followed by tagged records:
+#   b'E'  an event dispatched before a step: step, event type, key
+#   b'V'  the velocity of each car used by a step
+#   b'S'  a snapshot of the game state after a number of steps
+# Only the type and key of events are kept, which is all the game uses.
+MAGIC = b'RACE'
+VERSION = 3
+HEADER = struct.Struct('<4sHQdHIBd')  # magic, version, seed, dt, cars,
+                                      # interval, auto race, track scale
+EVENT = struct.Struct('<IIi')       # step, type, key
+STEP = struct.Struct('<I')          # step, followed by one double per car
+SNAP = struct.Struct('<IB')         # step, racing, followed by the cars
+CAR = struct.Struct('<6di')         # pos, prev pos, vel, score
+RNG = struct.Struct('<625I')        # Mersenne Twister state and index
+
+
+class ReplayError(Exception):
+    """Raised when a replay file can't be read."""
+
+
+def pack_state(game, cars, step):
+    """Pack the state of the game after a number of steps."""
+    store = game.entities
+    data = [SNAP.pack(step, game.racing)]
+    for car in cars:
+        i = car.index
+        data.append(CAR.pack(store.pos[i, 0], store.pos[i, 1],
+                             store.prev[i, 0], store.prev[i, 1],
+                             store.vel[i, 0], store.vel[i, 1], car.score))
+    data.append(RNG.pack(*game.rng.getstate()[1]))
+    return b''.join(data)
+
+
+def unpack_state(game, cars, data):
+    """Restore a state packed by pack_state. Returns the step it was at."""
+    store = game.entities
+    step, racing = SNAP.unpack_from(data)
+    offset = SNAP.size
+
+    for car in cars:
+        px, py, qx, qy, vx, vy, score = CAR.unpack_from(data, offset)
+        offset += CAR.size
+
+        i = car.index
+        store.pos[i] = px, py
+        store.prev[i] = qx, qy
+        store.vel[i] = vx, vy
+        car.score = score
+
+    game.rng.setstate((3, RNG.unpack_from(data, offset), None))
+    game.racing = bool(racing)
+    game.hud.update_hud_surf()
+    return step
+
+
+class Recorder(object):
+    """Records a race session to a compact binary replay file.
+
+    Attaching a recorder seeds the game, writes the starting state, and
+    hooks into the EventManager and Game.update. Needs a fixed timestep.
+
+    """
+
+    def __init__(self, filename, game, seed, dt, interval=600):
+        self.file = open(filename, 'wb')
+        self.game = game
+        self.cars = list(game.sprites)
+        self.interval = interval
+        self.step = 0
+        self.vel = struct.Struct('<{}d'.format(len(self.cars)))
+
+        game.seed(seed)
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, dt, len(self.cars),
+                                    interval, game.auto_race,
+                                    game.track_scale))
+        self.snapshot()
+
+        game.recorder = self
+        game.evt_mgr.recorder = self
+
+    def record_events(self, evts):
+        """Record the events that have subscribers."""
+        handlers = self.game.evt_mgr.handlers
+        for evt in evts:
+            if evt.type in handlers:
+                self.file.write(b'E' + EVENT.pack(
+                    self.step, evt.type, getattr(evt, 'key', 0)))
+
+    def record_vels(self):
+        """Record the velocities a step moves the cars by.
+
+        Called by Game.update before moving the cars, since finishing the
+        race stops them afterwards.
+
+        """
+        self.file.write(b'V' + STEP.pack(self.step) +
+                        self.vel.pack(*[car.vel.x for car in self.cars]))
+
+    def record_step(self):
+        """Finish a step. Called at the end of Game.update."""
+        self.step += 1
+
+        if self.step % self.interval == 0:
+            self.snapshot()
+
+    def snapshot(self):
+        """Record the current state of the game."""
+        self.file.write(b'S' + pack_state(self.game, self.cars, self.step))
+
+    def close(self):
+        """Write the final state and close the file."""
+        if self.file.closed:
+            return
+
+        if self.step % self.interval != 0:
+            self.snapshot()
+        self.file.close()
+
+        self.game.recorder = None
+        self.game.evt_mgr.recorder = None
+
+
+class Player(object):
+    """Plays back a replay file on a built (usually headless) game.
+
+    Events are dispatched before the step they were recorded at, and the
+    velocities of every step are checked against the recording. Any step
+    that doesn't match is added to desyncs.
+
+    """
+
+    def __init__(self, filename, game):
+        self.game = game
+        self.cars = list(game.sprites)
+        self.events = {}     # {step: [(type, key), ...]}
+        self.vels = list()   # [(vel, ...), ...] by step
+        self.snapshots = list()  # [(step, data), ...]
+        self.desyncs = list()
+        self.step = 0
+
+        self.load(filename)
+
+        # Races start the same way they did when recording. The game hands
+        # each step's velocities to its recorder, which checks them here.
+        game.auto_race = bool(self.auto_race)
+        game.recorder = self
+        self.seek(0)
+
+    def load(self, filename):
+        """Read the whole replay file."""
+        with open(filename, 'rb') as f:
+            data = f.read()
+
+        try:
+            (magic, version, self.seed, self.dt, n_cars, self.interval,
+             self.auto_race, track_scale) = HEADER.unpack_from(data)
+        except struct.error:
+            raise ReplayError('{} is too short'.format(filename))
+        if magic != MAGIC or version != VERSION:
+            raise ReplayError('{} is not a replay file'.format(filename))
+        if n_cars != len(self.cars):
+            raise ReplayError('replay has {} cars, game has {}'.format(
+                n_cars, len(self.cars)))
+        if track_scale != self.game.track_scale:
+            raise ReplayError('replay track is {} screens, game is {}'.format(
+                track_scale, self.game.track_scale))
+
+        vel = struct.Struct('<{}d'.format(n_cars))
+        snap_size = SNAP.size + CAR.size * n_cars + RNG.size
+
+        offset = HEADER.size
+        while offset < len(data):
+            tag = data[offset:offset + 1]
+            offset += 1
+
+            if tag == b'E':
+                step, evt_type, key = EVENT.unpack_from(data, offset)
+                self.events.setdefault(step, []).append((evt_type, key))
+                offset += EVENT.size
+            elif tag == b'V':
+                offset += STEP.size
+                self.vels.append(vel.unpack_from(data, offset))
+                offset += vel.size
+            elif tag == b'S':
+                step = SNAP.unpack_from(data, offset)[0]
+                self.snapshots.append((step, data[offset:offset + snap_size]))
+                offset += snap_size
+            else:
+                raise ReplayError('bad record {!r} at byte {}'.format(tag,
+                                                                       offset))
+
+    @property
+    def length(self):
+        """The number of steps in the recording."""
+        return len(self.vels)
+
+    def seek(self, step):
+        """Jump to the state after a number of steps.
+
+        Restores the closest snapshot before it and plays forward from
+        there, so seeking costs at most one snapshot interval of steps.
+
+        """
+        step = max(0, min(step, self.length))
+        snap_step, data = max((s for s in self.snapshots if s[0] <= step),
+                              key=lambda s: s[0])
+        self.step = unpack_state(self.game, self.cars, data)
+        self.play(step - snap_step)
+
+    def advance(self):
+        """Play a single step."""
+        for evt_type, key in self.events.get(self.step, ()):
+            evt = pygame.event.Event(evt_type, key=key)
+            self.game.evt_mgr.dispatch([evt])
+
+        self.game.update(self.dt)
+        self.step += 1
+
+    def record_vels(self):
+        """Check the velocities of a step against the recording."""
+        vels = tuple(car.vel.x for car in self.cars)
+        if vels != self.vels[self.step]:
+            self.desyncs.append(self.step)
+
+    def record_step(self):
+        """Called at the end of Game.update. The step is counted by advance."""
+
+    def play(self, steps=None):
+        """Play forward a number of steps, or to the end."""
+        end = self.length if steps is None else min(self.length,
+                                                    self.step + steps)
+        while self.step < end:
+            self.advance()
+
+    def final_scores(self):
+        """Return the scores from the last snapshot in the recording."""
+        step, data = self.snapshots[-1]
+        n = len(self.cars)
+        offset = SNAP.size
+        return [CAR.unpack_from(data, offset + CAR.size * i)[6]
+                for i in range(n)]
+
+
+def get_args():
+    """Init the parser and return the arguments."""
+    parser = argparse.ArgumentParser(description='Lab 3: Replay a race')
+
+    parser.add_argument('filename', help='the replay file to play')
+    parser.add_argument('-s', '--seek', type=int,
+                        help='the step to seek to before playing')
+    parser.add_argument('-t', '--track', type=float, default=1,
+                        help='the track length in screens (default: 1)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from basic_game.app import App
+    from main import Game
+
+    args = get_args()
+    cfg = {
+        'SCR_SIZE': (1024, 480),
+        'SCR_CAP': '',
+        'SCR_FLAGS': 0,
+        'LOGGING': 'False',
+        'HEADLESS': True
+    }
+    game = Game()
+    game.track_scale = args.track
+    app = App(cfg, game)
+
+    player = Player(args.filename, game)
+    if args.seek:
+        player.seek(args.seek)
+
+    start = time.perf_counter()
+    player.play()
+    elapsed = time.perf_counter() - start
+
+    real_time = player.length * player.dt / 1000
+    print('Played {} steps ({:.1f}s) in {:.2f}s'.format(
+        player.length, real_time, elapsed))
+
+    for car, recorded in zip(player.cars, player.final_scores()):
+        print('{}: {} wins (recorded {})'.format(car.name, car.score,
+                                                 recorded))
+    if player.desyncs:
+        print('Desynced at step {}'.format(player.desyncs[0]))
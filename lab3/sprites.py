@@ -1,17 +1,28 @@
 import pygame
+from basic_game.entities import EntityStore, VecView
 
 
 class Car(pygame.sprite.Sprite):
-    """Car sprite."""
+    """Car sprite, optionally drawn from an area of an atlas page."""
 
-    def __init__(self, name, img_surf):
+    def __init__(self, name, img_surf, store=None, area=None):
         # Parent class constructor must be called.
         super(Car, self).__init__()
 
         self.name = name
-        self.image = img_surf
+        self.page = img_surf
+        self.area = area
+        if area is None:
+            self.image = img_surf
+        else:
+            self.image = img_surf.subsurface(area)
         self.rect = self.image.get_rect()
-        self.vel = pygame.math.Vector2(0, 0)
+
+        self.owns_store = store is None
+        self.store = EntityStore(1) if store is None else store
+        self.index = self.store.add(self.rect.topleft)
+        self.pos = VecView(self.store, 'pos', self.index)
+        self.vel = VecView(self.store, 'vel', self.index)
 
         self.score = 0
         self.on_score_change = lambda x: None
@@ -22,9 +33,45 @@ class Car(pygame.sprite.Sprite):
         self.on_score_change()
 
     def update(self, dt):
-        """Update the cars position."""
-        self.rect.x += self.vel.x * dt
-        self.rect.y += self.vel.y * dt
+        """Update the cars position. Only needed if it owns its store."""
+        if self.owns_store:
+            self.store.integrate(dt)
+        self.sync_rect()
+
+    def sync_rect(self):
+        """Move the rect to the (rounded) position.
+
+        Positions are floats so slow cars still move at small time steps.
+        The rect is only for drawing and collisions.
+
+        """
+        self.rect.topleft = self.pos
+
+    def crossing_time(self, line_x):
+        """Return when the front of the car reached line_x last update.
+
+        The time is a fraction of the update from 0 to 1, or None if the car
+        hasn't reached the line.
+
+        """
+        width = self.rect.width
+        start = self.store.prev[self.index, 0] + width
+        end = self.pos.x + width
+
+        if end < line_x:
+            return None
+        if start >= line_x:
+            return 0.0
+        return (line_x - start) / (end - start)
+
+    def snap(self):
+        """Forget the previous position so the next draw isn't blended."""
+        self.store.snap(self.index)
+        self.sync_rect()
+
+    def lerp_pos(self, alpha):
+        """Return the position blended between the last two updates."""
+        return self.store.lerp(self.index, alpha)
 
     def __str__(self):
         return self.name